@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ApiToken
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Выдаёт пользователю токен API для клиентов без браузера; '
+            'ключ печатается один раз')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--name', default='', help='название, например имя клиента')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден')
+        self.stdout.write(ApiToken.issue(user, options['name']))
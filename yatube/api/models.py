@@ -0,0 +1,40 @@
+import hashlib
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiToken(models.Model):
+    """Токен клиента API без браузера; в базе хранится только хэш ключа."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_tokens'
+    )
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    name = models.CharField('Название', max_length=100, blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.user}: {self.name or self.pk}'
+
+    @classmethod
+    def issue(cls, user, name=''):
+        """Создаёт токен user и возвращает ключ; второй раз его не узнать."""
+        key = secrets.token_urlsafe(32)
+        cls.objects.create(user=user, key_hash=hash_key(key), name=name)
+        return key
+
+    @classmethod
+    def authenticate(cls, key):
+        """Пользователь с ключом key или None."""
+        token = cls.objects.select_related('user').filter(
+            key_hash=hash_key(key), user__is_active=True).first()
+        return token and token.user
@@ -0,0 +1,66 @@
+"""Представление моделей posts в JSON с выбором полей.
+
+Для каждой модели описаны поля ответа: как получить значение и какая
+связь для этого нужна. Клиент может запросить только часть полей
+(?fields=id,text), и тогда queryset соединяется только с нужными
+таблицами.
+"""
+
+
+class FieldError(ValueError):
+    """Клиент запросил поле, которого нет."""
+
+
+POST_FIELDS = {
+    'id': (lambda post: post.pk, None),
+    'text': (lambda post: post.text, None),
+    'pub_date': (lambda post: post.pub_date.isoformat(), None),
+    'author': (lambda post: post.author.username, 'author'),
+    'group': (lambda post: post.group_id, None),
+    'image': (lambda post: post.image.url if post.image else None, None),
+}
+
+COMMENT_FIELDS = {
+    'id': (lambda comment: comment.pk, None),
+    'post': (lambda comment: comment.post_id, None),
+    'author': (lambda comment: comment.author.username, 'author'),
+    'text': (lambda comment: comment.text, None),
+    'created': (lambda comment: comment.created.isoformat(), None),
+}
+
+GROUP_FIELDS = {
+    'id': (lambda group: group.pk, None),
+    'title': (lambda group: group.title, None),
+    'slug': (lambda group: group.slug, None),
+    'description': (lambda group: group.description, None),
+}
+
+FOLLOW_FIELDS = {
+    'id': (lambda follow: follow.pk, None),
+    'author': (lambda follow: follow.author.username, 'author'),
+}
+
+
+def requested_fields(request, spec):
+    """Поля из ?fields=..., по умолчанию все поля spec."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(spec)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = set(fields) - set(spec)
+    if unknown:
+        raise FieldError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def plan(queryset, spec, fields):
+    """Соединяет queryset только со связями, нужными для fields."""
+    related = {spec[field][1] for field in fields} - {None}
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset
+
+
+def serialize(obj, spec, fields):
+    return {field: spec[field][0](obj) for field in fields}
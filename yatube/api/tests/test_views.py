@@ -0,0 +1,219 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from api.models import ApiToken
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+COUNT_POSTS = 15
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group)
+            for number in range(COUNT_POSTS)
+        ]
+        cls.post = cls.posts[-1]
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data):
+        return getattr(client, method)(
+            url, json.dumps(data), content_type='application/json')
+
+    def test_posts_cursor_pagination(self):
+        url = reverse('api:posts')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(first['results'][0]['id'], self.post.pk)
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), COUNT_POSTS - 10)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), COUNT_POSTS)
+
+    def test_sparse_fields_skip_joins(self):
+        url = reverse('api:posts')
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(url, {'fields': 'id,text'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'text'})
+        self.assertNotIn('auth_user', context.captured_queries[0]['sql'])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,author'})
+        self.assertEqual(response.json()['results'][0]['author'], 'author')
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api:posts'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk(self):
+        ids = [self.posts[3].pk, self.posts[1].pk, 0]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('api:posts_bulk'),
+                {'ids': ','.join(str(pk) for pk in ids)})
+        data = response.json()
+        self.assertEqual(
+            [post['id'] for post in data['results']], ids[:2])
+        self.assertEqual(data['missing'], [0])
+
+    def test_create_post_validated_by_form(self):
+        url = reverse('api:posts')
+        self.assertEqual(
+            self.send(self.client, 'post', url, {'text': 'Новый'}).status_code,
+            401)
+        response = self.send(self.author_client, 'post', url, {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        response = self.send(
+            self.author_client, 'post', url,
+            {'text': 'Новый', 'group': self.group.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Post.objects.filter(
+            text='Новый', group=self.group, author=self.author).exists())
+
+    def test_edit_and_delete_only_by_author(self):
+        url = reverse('api:post', args=(self.post.pk,))
+        response = self.send(self.reader_client, 'patch', url, {'text': 'X'})
+        self.assertEqual(response.status_code, 403)
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Изменён'})
+        self.assertEqual(response.json()['text'], 'Изменён')
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).group_id, self.group.pk)
+        self.assertEqual(self.author_client.delete(url).status_code, 204)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_import_posts(self):
+        url = reverse('api:posts_import')
+        body = '\n'.join(json.dumps(record) for record in (
+            {'text': 'Импорт', 'group': 'api', 'author': 'reader'},
+            {'text': ''},
+        ))
+        response = self.client.post(
+            url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 401)
+        response = self.author_client.post(
+            url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 1))
+        self.assertEqual(data['errors'][0]['line'], 2)
+        self.assertTrue(Post.objects.filter(
+            text='Импорт', group=self.group, author=self.author).exists())
+
+    def test_import_rejects_non_string_values(self):
+        response = self.author_client.post(
+            reverse('api:posts_import'),
+            json.dumps({'text': 'Импорт', 'group': [1]}),
+            content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('group', response.json()['errors'][0]['errors'])
+
+    def test_comments(self):
+        url = reverse('api:comments', args=(self.post.pk,))
+        response = self.send(
+            self.reader_client, 'post', url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Ответ')
+        data = self.client.get(url, {'limit': 1}).json()
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+        data = self.client.get(url, {'cursor': data['next']}).json()
+        self.assertEqual(data['results'][0]['text'], 'Ответ')
+        self.assertIsNone(data['next'])
+
+    def test_groups(self):
+        self.assertEqual(
+            self.client.get(reverse('api:groups')).json()['results'][0][
+                'slug'], 'api')
+        response = self.client.get(
+            reverse('api:group', args=('api',)), {'fields': 'title'})
+        self.assertEqual(response.json(), {'title': 'Группа'})
+
+    def test_follows(self):
+        url = reverse('api:follows')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'})
+        self.assertEqual(response.status_code, 201)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.reader_client.get(url).json()['results'],
+            [{'id': Follow.objects.get().pk, 'author': 'author'}])
+        response = self.reader_client.delete(
+            reverse('api:follow', args=('author',)))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_method_not_allowed(self):
+        response = self.client.put(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, POST')
+
+
+class ApiAuthTests(TestCase):
+    """Запись через API с настоящей проверкой CSRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='client')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client(enforce_csrf_checks=True)
+        self.url = reverse('api:posts')
+        self.body = json.dumps({'text': 'Из приложения'})
+
+    def test_session_write_requires_csrf(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.url, self.body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['detail'])
+        # Cookie csrftoken выдаёт любая страница сайта с формой
+        self.client.get(reverse('posts:post_create'))
+        response = self.client.post(
+            self.url, self.body, content_type='application/json',
+            HTTP_X_CSRFTOKEN=self.client.cookies['csrftoken'].value)
+        self.assertEqual(response.status_code, 201)
+
+    def test_token_write_skips_csrf(self):
+        out = StringIO()
+        call_command('create_api_token', 'client', stdout=out)
+        key = out.getvalue().strip()
+        response = self.client.post(
+            self.url, self.body, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'client')
+        self.assertTrue(ApiToken.objects.filter(user=self.user).exists())
+
+    def test_wrong_token_rejected(self):
+        response = self.client.post(
+            self.url, self.body, content_type='application/json',
+            HTTP_AUTHORIZATION='Token wrong')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'Неверный токен')
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    # Несколько постов по id одним запросом
+    path('posts/bulk/', views.posts_bulk, name='posts_bulk'),
+    path('posts/import/', views.posts_import, name='posts_import'),
+    path('posts/<int:post_id>/', views.post, name='post'),
+    path(
+        'posts/<int:post_id>/comments/', views.comments, name='comments'),
+    path('groups/', views.groups, name='groups'),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path('follows/', views.follows, name='follows'),
+    path('follows/<str:username>/', views.follow, name='follow'),
+]
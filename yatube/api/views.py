@@ -0,0 +1,297 @@
+import json
+from functools import wraps
+from itertools import islice
+
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+
+from posts import ingest
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import COUNT_LAST_POSTS, CursorPaginator
+
+from .models import ApiToken
+from .serializers import (COMMENT_FIELDS, FOLLOW_FIELDS, GROUP_FIELDS,
+                          POST_FIELDS, FieldError, plan, requested_fields,
+                          serialize)
+
+MAX_PAGE_SIZE = 100
+MAX_BULK_IDS = 100
+MAX_IMPORT_POSTS = 1000
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+FORM_CONTENT_TYPES = ('multipart/form-data',
+                      'application/x-www-form-urlencoded')
+TOKEN_PREFIX = 'Token '
+
+
+class BadRequest(ValueError):
+    """Запрос клиента нельзя разобрать."""
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def form_errors(form):
+    return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+
+
+def authenticate(request):
+    """Ответ с ошибкой, если запрос не прошёл проверку, иначе None.
+
+    Клиент без браузера передаёт заголовок Authorization: Token <ключ>
+    (ключ выдаёт команда create_api_token), и CSRF для него не
+    проверяется. Запись по cookie сессии требует CSRF-токен в
+    заголовке X-CSRFToken, как формы сайта.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith(TOKEN_PREFIX):
+        user = ApiToken.authenticate(header[len(TOKEN_PREFIX):].strip())
+        if user is None:
+            return error(401, 'Неверный токен')
+        request.user = user
+        return None
+    if request.method in SAFE_METHODS:
+        return None
+    if not request.user.is_authenticated:
+        return error(401, 'Требуется авторизация')
+    if CsrfViewMiddleware().process_view(request, None, (), {}) is not None:
+        return error(403, 'Нет CSRF-токена или он неверен')
+    return None
+
+
+def api_view(*methods):
+    """Разрешает только methods; запись — только вошедшим пользователям.
+
+    Ошибки разбора запроса превращаются в ответ 400 с JSON. CSRF
+    проверяет authenticate(), чтобы отказ тоже был в JSON.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error(405, f'Метод {request.method} не разрешён')
+                response['Allow'] = ', '.join(methods)
+                return response
+            failure = authenticate(request)
+            if failure is not None:
+                return failure
+            try:
+                return view(request, *args, **kwargs)
+            except (BadRequest, FieldError) as exc:
+                return error(400, str(exc))
+            except Http404:
+                return error(404, 'Не найдено')
+        return wrapper
+    return decorator
+
+
+def parse_body(request):
+    """Данные запроса: JSON-объект или поля формы с файлами."""
+    if request.content_type in FORM_CONTENT_TYPES:
+        return request.POST, request.FILES
+    try:
+        data = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise BadRequest('Тело запроса не является JSON')
+    if not isinstance(data, dict):
+        raise BadRequest('Ожидается JSON-объект')
+    return data, None
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', COUNT_LAST_POSTS))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def post_list(request, queryset):
+    """Страница постов по курсору (pub_date, id), от новых к старым."""
+    fields = requested_fields(request, POST_FIELDS)
+    paginator = CursorPaginator(
+        plan(queryset, POST_FIELDS, fields), page_size(request))
+    page = paginator.page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize(post, POST_FIELDS, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def id_list(request, queryset, spec):
+    """Страница объектов в порядке id; курсор — последний id страницы."""
+    fields = requested_fields(request, spec)
+    size = page_size(request)
+    queryset = plan(queryset, spec, fields).order_by('pk')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            queryset = queryset.filter(pk__gt=int(cursor))
+        except ValueError:
+            raise BadRequest('Неверный курсор')
+    objects = list(queryset[:size + 1])
+    has_next = len(objects) > size
+    objects = objects[:size]
+    return JsonResponse({
+        'results': [serialize(obj, spec, fields) for obj in objects],
+        'next': str(objects[-1].pk) if has_next else None,
+    })
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    """Лента постов с фильтрами ?group=slug и ?author=username; создание."""
+    if request.method == 'POST':
+        data, files = parse_body(request)
+        form = PostForm(data, files=files)
+        if not form.is_valid():
+            return form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        with transaction.atomic():
+            post.save()
+        return JsonResponse(
+            serialize(post, POST_FIELDS, list(POST_FIELDS)), status=201)
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return post_list(request, queryset)
+
+
+@api_view('GET')
+def posts_bulk(request):
+    """Посты по списку ?ids=1,2,3 одним запросом, в порядке списка."""
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        raise BadRequest('ids должны быть числами через запятую')
+    if len(ids) > MAX_BULK_IDS:
+        raise BadRequest(f'Не больше {MAX_BULK_IDS} id за запрос')
+    fields = requested_fields(request, POST_FIELDS)
+    found = plan(Post.objects.all(), POST_FIELDS, fields).in_bulk(ids)
+    return JsonResponse({
+        'results': [
+            serialize(found[pk], POST_FIELDS, fields)
+            for pk in ids if pk in found],
+        'missing': [pk for pk in ids if pk not in found],
+    })
+
+
+@api_view('POST')
+def posts_import(request):
+    """Импорт постов пользователя из NDJSON.
+
+    Строки передаются телом запроса или файлом posts формы; картинки
+    строк — файлами формы с теми же именами.
+    """
+    if request.content_type in FORM_CONTENT_TYPES:
+        if 'posts' not in request.FILES:
+            raise BadRequest('Нет файла posts')
+        source = request.FILES['posts']
+    else:
+        source = request.body.splitlines()
+    lines = list(islice(source, MAX_IMPORT_POSTS + 1))
+    if len(lines) > MAX_IMPORT_POSTS:
+        raise BadRequest(f'Не больше {MAX_IMPORT_POSTS} постов за запрос')
+    importer = ingest.Importer(
+        author=request.user, files=request.FILES).run(lines)
+    return JsonResponse(
+        {'created': importer.created, 'failed': importer.failed,
+         'errors': importer.errors},
+        status=201 if importer.created else 400)
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    """Пост; изменить и удалить его может только автор."""
+    fields = requested_fields(request, POST_FIELDS)
+    post = get_object_or_404(
+        plan(Post.objects.all(), POST_FIELDS, fields), pk=post_id)
+    if request.method == 'GET':
+        return JsonResponse(serialize(post, POST_FIELDS, fields))
+    if post.author_id != request.user.pk:
+        return error(403, 'Изменять пост может только автор')
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            post.delete()
+        return HttpResponse(status=204)
+    data, _ = parse_body(request)
+    form = PostForm(
+        {'text': post.text, 'group': post.group_id, **data}, instance=post)
+    if not form.is_valid():
+        return form_errors(form)
+    with transaction.atomic():
+        post = form.save()
+    return JsonResponse(serialize(post, POST_FIELDS, fields))
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    """Комментарии поста по порядку добавления; новый комментарий."""
+    post = get_object_or_404(Post, pk=post_id)
+    if request.method == 'POST':
+        data, _ = parse_body(request)
+        form = CommentForm(data)
+        if not form.is_valid():
+            return form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        with transaction.atomic():
+            comment.save()
+        return JsonResponse(
+            serialize(comment, COMMENT_FIELDS, list(COMMENT_FIELDS)),
+            status=201)
+    return id_list(
+        request, Comment.objects.filter(post=post), COMMENT_FIELDS)
+
+
+@api_view('GET')
+def groups(request):
+    return id_list(request, Group.objects.all(), GROUP_FIELDS)
+
+
+@api_view('GET')
+def group(request, slug):
+    fields = requested_fields(request, GROUP_FIELDS)
+    group = get_object_or_404(Group, slug=slug)
+    return JsonResponse(serialize(group, GROUP_FIELDS, fields))
+
+
+@api_view('GET', 'POST')
+def follows(request):
+    """Подписки пользователя; подписка на {"author": username}."""
+    if not request.user.is_authenticated:
+        return error(401, 'Требуется авторизация')
+    if request.method == 'GET':
+        return id_list(
+            request, Follow.objects.filter(user=request.user), FOLLOW_FIELDS)
+    data, _ = parse_body(request)
+    author = get_object_or_404(User, username=data.get('author'))
+    if author == request.user:
+        raise BadRequest('Нельзя подписаться на себя')
+    with transaction.atomic():
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author)
+    return JsonResponse(
+        serialize(follow, FOLLOW_FIELDS, list(FOLLOW_FIELDS)),
+        status=201 if created else 200)
+
+
+@api_view('DELETE')
+def follow(request, username):
+    """Отписка от автора username."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            user=request.user, author__username=username).delete()
+    if not deleted:
+        return error(404, 'Подписки нет')
+    return HttpResponse(status=204)
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .sqlite import apply_pragmas
+        connection_created.connect(
+            apply_pragmas, dispatch_uid='core.sqlite.apply_pragmas')
+        if settings.TEMPLATE_PROFILE:
+            from .template_profiler import install
+            install()
@@ -0,0 +1,40 @@
+"""Маршрутизация чтения на реплики базы данных.
+
+Чтение моделей приложений из REPLICA_APPS уходит на реплику только
+внутри view из REPLICA_READ_VIEWS, которые включает
+ReplicaRoutingMiddleware. Запись и всё остальное чтение, в том числе
+сессии и пользователи, идут в основную базу default.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def use_replica(enabled):
+    _state.use_replica = enabled
+
+
+def replica_enabled():
+    return getattr(_state, 'use_replica', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (replica_enabled() and settings.REPLICA_DATABASES
+                and model._meta.app_label in settings.REPLICA_APPS):
+            return random.choice(settings.REPLICA_DATABASES)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
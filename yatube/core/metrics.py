@@ -0,0 +1,222 @@
+"""Метрики производительности запросов по именам маршрутов.
+
+MetricsMiddleware выбирает долю запросов METRICS_SAMPLE_RATE и на время
+такого запроса кладёт RequestMetrics в локальную память потока: обёртка
+execute_wrapper считает SQL, кэш фрагментов и шаблонный движок
+добавляют свои замеры через record_*(). Для невыбранного запроса
+record_*() сразу возвращаются, так что при выключенной выборке
+накладные расходы сводятся к одной проверке.
+
+Итоги копятся в памяти процесса и отдаются в формате Prometheus;
+при нескольких процессах каждый собирается отдельно.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Границы корзин гистограммы времени ответа, секунды
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+UNRESOLVED = 'unresolved'
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0
+        self.queries = 0
+        self.query_time = 0
+        self.cache = defaultdict(int)
+        self.template_time = 0
+        self.template_depth = 0
+        # Профиль отрисовки: часть -> [число отрисовок, секунды]
+        self.render = defaultdict(lambda: [0, 0])
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: время каждого SQL."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            'duration': round(self.duration, 6),
+            'queries': self.queries,
+            'query_time': round(self.query_time, 6),
+            'cache': dict(self.cache),
+            'template_time': round(self.template_time, 6),
+            'render': {
+                part: [count, round(seconds, 6)]
+                for part, (count, seconds) in self.render.items()},
+        }
+
+
+def current():
+    """Замеры текущего запроса или None, если он не попал в выборку."""
+    return getattr(_local, 'metrics', None)
+
+
+def start():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def finish():
+    metrics = _local.metrics
+    _local.metrics = None
+    metrics.duration = time.perf_counter() - metrics.started
+    return metrics
+
+
+def record_cache(outcome):
+    """Учитывает обращение к кэшу: hit, miss или stale."""
+    metrics = current()
+    if metrics is not None:
+        metrics.cache[outcome] += 1
+
+
+@contextmanager
+def record_template():
+    """Учитывает время отрисовки шаблона.
+
+    Вложенные отрисовки входят во внешнюю и отдельно не считаются.
+    """
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+@contextmanager
+def record_render(part):
+    """Учитывает время отрисовки части страницы: шаблона или тега.
+
+    Время включает вложенные части, поэтому шаблон страницы содержит
+    время всех своих include и тегов.
+    """
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = metrics.render[part]
+        total[0] += 1
+        total[1] += time.perf_counter() - started
+
+
+class Registry:
+    """Накопленные метрики процесса по именам маршрутов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = defaultdict(lambda: {
+                'count': 0,
+                'buckets': [0] * len(DURATION_BUCKETS),
+                'duration': 0,
+                'queries': 0,
+                'query_time': 0,
+                'cache': defaultdict(int),
+                'template_time': 0,
+                'render': defaultdict(lambda: [0, 0]),
+            })
+
+    def add(self, view, metrics):
+        with self.lock:
+            total = self.views[view]
+            total['count'] += 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.duration <= bound:
+                    total['buckets'][index] += 1
+            total['duration'] += metrics.duration
+            total['queries'] += metrics.queries
+            total['query_time'] += metrics.query_time
+            for outcome, count in metrics.cache.items():
+                total['cache'][outcome] += count
+            total['template_time'] += metrics.template_time
+            for part, (count, seconds) in metrics.render.items():
+                total['render'][part][0] += count
+                total['render'][part][1] += seconds
+
+    def prometheus(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                '# HELP yatube_request_duration_seconds '
+                'Request wall time by URL name.',
+                '# TYPE yatube_request_duration_seconds histogram',
+            ]
+            for view, total in views:
+                for bound, count in zip(DURATION_BUCKETS, total['buckets']):
+                    lines.append(
+                        f'yatube_request_duration_seconds_bucket'
+                        f'{{view="{view}",le="{bound}"}} {count}')
+                lines += [
+                    f'yatube_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="+Inf"}} {total["count"]}',
+                    f'yatube_request_duration_seconds_sum'
+                    f'{{view="{view}"}} {total["duration"]:.6f}',
+                    f'yatube_request_duration_seconds_count'
+                    f'{{view="{view}"}} {total["count"]}',
+                ]
+            for name, key, help_text in (
+                    ('yatube_db_queries_total', 'queries',
+                     'SQL queries by URL name.'),
+                    ('yatube_db_query_seconds_total', 'query_time',
+                     'SQL time by URL name.'),
+                    ('yatube_template_render_seconds_total', 'template_time',
+                     'Template render time by URL name.')):
+                lines += [f'# HELP {name} {help_text}',
+                          f'# TYPE {name} counter']
+                lines += [
+                    f'{name}{{view="{view}"}} {total[key]:.6g}'
+                    for view, total in views
+                ]
+            lines += [
+                '# HELP yatube_cache_requests_total '
+                'Fragment cache lookups by URL name and result.',
+                '# TYPE yatube_cache_requests_total counter',
+            ]
+            for view, total in views:
+                lines += [
+                    f'yatube_cache_requests_total'
+                    f'{{view="{view}",result="{outcome}"}} {count}'
+                    for outcome, count in sorted(total['cache'].items())
+                ]
+            lines += [
+                '# HELP yatube_render_part_seconds_total '
+                'Render time of templates and tags by URL name.',
+                '# TYPE yatube_render_part_seconds_total counter',
+            ]
+            for view, total in views:
+                lines += [
+                    f'yatube_render_part_seconds_total'
+                    f'{{view="{view}",part="{part}"}} {seconds:.6g}'
+                    for part, (_, seconds) in sorted(total['render'].items())
+                ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
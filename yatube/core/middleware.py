@@ -0,0 +1,119 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, querylog
+from .db_router import use_replica
+
+logger = logging.getLogger('yatube.metrics')
+
+# Cookie с моментом, до которого чтение идёт из основной базы
+PRIMARY_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет чтение страниц из REPLICA_READ_VIEWS на реплики.
+
+    После любого запроса на запись пользователь получает cookie и
+    REPLICA_STICKY_SECONDS секунд читает из основной базы, поэтому сразу
+    видит свои изменения, даже если реплика отстаёт. Запросом на запись
+    считается любой небезопасный метод и страницы REPLICA_WRITE_VIEWS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica(False)
+        if self.is_write(request):
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                PRIMARY_COOKIE, str(int(time.time() + sticky)),
+                max_age=sticky, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replica(
+            request.method in SAFE_METHODS
+            and request.resolver_match.view_name
+            in settings.REPLICA_READ_VIEWS
+            and not self.is_sticky(request))
+
+    @staticmethod
+    def is_write(request):
+        match = getattr(request, 'resolver_match', None)
+        return request.method not in SAFE_METHODS or (
+            match is not None
+            and match.view_name in settings.REPLICA_WRITE_VIEWS)
+
+    @staticmethod
+    def is_sticky(request):
+        try:
+            return float(request.COOKIES[PRIMARY_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+
+class MetricsMiddleware:
+    """Замеряет выборку запросов и копит итоги по именам маршрутов.
+
+    Время ответа, число и время SQL-запросов ко всем базам, обращения
+    к кэшу фрагментов и время отрисовки шаблонов попадают в
+    core.metrics.registry и, если METRICS_LOG включён, в лог
+    одной строкой JSON на запрос.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        request_metrics = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics))
+                response = self.get_response(request)
+        finally:
+            metrics.finish()
+        match = request.resolver_match
+        view = match.view_name if match else metrics.UNRESOLVED
+        metrics.registry.add(view, request_metrics)
+        if settings.METRICS_LOG:
+            logger.info(json.dumps(dict(
+                request_metrics.as_dict(), view=view,
+                status=response.status_code)))
+        return response
+
+
+class QueryInspectionMiddleware:
+    """Ищет медленные запросы и N+1, если включён QUERY_INSPECTION."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSPECTION:
+            return self.get_response(request)
+        inspector = querylog.QueryInspector(request.path)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspector))
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None:
+            inspector.view = match.view_name
+            inspector.report(match.func.__module__)
+        return response
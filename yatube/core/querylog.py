@@ -0,0 +1,94 @@
+"""Журнал медленных SQL-запросов и поиск N+1.
+
+Включается настройкой QUERY_INSPECTION: 'log' пишет находки в лог
+yatube.queries, 'raise' вдобавок падает с NPlusOneError на страницах
+из QUERY_INSPECTION_MODULES, чтобы тесты не пропускали N+1.
+
+Формой запроса считается его SQL без параметров, где списки
+плейсхолдеров IN (%s, %s, ...) свёрнуты в один. Одинаковая форма,
+повторённая за запрос NPLUSONE_THRESHOLD раз и больше, почти всегда
+означает обращение к связанному объекту в цикле.
+"""
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+
+from . import template_backend
+
+logger = logging.getLogger('yatube.queries')
+
+PLACEHOLDER_LIST = re.compile(r'%s(?:, %s)+')
+# Обёртки, кадры которых не объясняют, откуда пришёл запрос
+SKIPPED_FILES = {
+    os.path.abspath(__file__),
+    os.path.abspath(template_backend.__file__),
+}
+
+
+class NPlusOneError(AssertionError):
+    """Страница повторяет один и тот же запрос."""
+
+
+def query_shape(sql):
+    return PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+def origin():
+    """Самый глубокий кадр стека из кода проекта, а не Django."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(settings.BASE_DIR)
+                and filename not in SKIPPED_FILES
+                and 'site-packages' not in filename):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryInspector:
+    """Обёртка execute_wrapper, которая следит за запросами страницы."""
+
+    def __init__(self, view):
+        self.view = view
+        self.shapes = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            shape = query_shape(sql)
+            self.shapes[shape] += 1
+            if self.shapes[shape] == 2:
+                self.origins[shape] = origin()
+            if elapsed >= settings.SLOW_QUERY_MS:
+                logger.warning(
+                    'Slow query %.1f ms in %s at %s: %s',
+                    elapsed, self.view, origin(), sql)
+
+    def repeated(self):
+        """Формы, повторённые NPLUSONE_THRESHOLD раз и больше."""
+        return [
+            (shape, count, self.origins[shape])
+            for shape, count in self.shapes.most_common()
+            if count >= settings.NPLUSONE_THRESHOLD
+        ]
+
+    def report(self, module):
+        """Пишет вероятные N+1 в лог; в режиме raise падает на них."""
+        repeated = self.repeated()
+        for shape, count, where in repeated:
+            logger.warning(
+                'Probable N+1 in %s: %d x %s (first repeat at %s)',
+                self.view, count, shape, where)
+        if (repeated and settings.QUERY_INSPECTION == 'raise'
+                and module.startswith(settings.QUERY_INSPECTION_MODULES)):
+            shape, count, where = repeated[0]
+            raise NPlusOneError(
+                f'{self.view} repeats {count} x {shape} at {where}')
@@ -0,0 +1,24 @@
+"""Настройка соединений SQLite под нагрузку.
+
+При открытии каждого соединения выполняются PRAGMA из
+settings.SQLITE_PRAGMAS: журнал WAL позволяет читать во время записи,
+busy_timeout заставляет ждать блокировку вместо ошибки
+"database is locked", mmap_size и cache_size уменьшают число чтений
+с диска. Такие PRAGMA задаёт профиль production; профиль default
+ничего не меняет.
+"""
+import re
+
+from django.conf import settings
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            if not (name.isidentifier() and PRAGMA_VALUE.match(str(value))):
+                raise ValueError(f'Недопустимая PRAGMA {name}={value}')
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,20 @@
+"""Шаблонный движок Django с учётом времени отрисовки в метриках."""
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as DjangoTemplate
+
+from . import metrics
+
+
+class Template(DjangoTemplate):
+    def render(self, context=None, request=None):
+        with metrics.record_template():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
@@ -0,0 +1,52 @@
+"""Предварительная компиляция шаблонов для кэширующего загрузчика.
+
+С кэширующим загрузчиком шаблон разбирается при первом обращении.
+precompile() загружает все шаблоны из каталогов загрузчиков заранее,
+чтобы первые запросы после запуска процесса не платили за разбор.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов загрузчиков engine."""
+    names = set()
+    for loader in engine.template_loaders:
+        for source in getattr(loader, 'loaders', [loader]):
+            for directory in source.get_dirs():
+                for root, _, files in os.walk(directory):
+                    names.update(
+                        os.path.relpath(os.path.join(root, name), directory)
+                        .replace(os.sep, '/')
+                        for name in files
+                        if name.endswith(TEMPLATE_EXTENSIONS))
+    return sorted(names)
+
+
+def precompile():
+    """Компилирует шаблоны всех движков Django; возвращает их число."""
+    started = time.perf_counter()
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as exc:
+                # Шаблоны сторонних приложений могут требовать
+                # библиотек, которых в проекте нет.
+                logger.warning('Template %s not precompiled: %s', name, exc)
+                continue
+            compiled += 1
+    logger.info('Precompiled %s templates in %.2f s', compiled,
+                time.perf_counter() - started)
+    return compiled
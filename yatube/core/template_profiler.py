@@ -0,0 +1,50 @@
+"""Профиль отрисовки шаблонов по частям страницы.
+
+install() оборачивает Template._render и Node.render_annotated, и для
+запросов, попавших в выборку метрик, время каждого шаблона (включая
+подключённые через include и extends) и тегов из
+TEMPLATE_PROFILE_TAGS попадает в core.metrics под именами
+template:<имя> и tag:<тег>. Для остальных запросов обёртка только
+проверяет, что замеров нет.
+"""
+from django.conf import settings
+from django.template.base import Node, Template, TokenType
+
+from . import metrics
+
+_original_render = Template._render
+_original_render_annotated = Node.render_annotated
+
+
+def _tag_name(node):
+    token = getattr(node, 'token', None)
+    if token is None or token.token_type != TokenType.BLOCK:
+        return None
+    return token.contents.split(None, 1)[0]
+
+
+def _render(self, context):
+    if metrics.current() is None:
+        return _original_render(self, context)
+    with metrics.record_render(f'template:{self.name or "<string>"}'):
+        return _original_render(self, context)
+
+
+def _render_annotated(self, context):
+    if metrics.current() is None:
+        return _original_render_annotated(self, context)
+    name = _tag_name(self)
+    if name not in settings.TEMPLATE_PROFILE_TAGS:
+        return _original_render_annotated(self, context)
+    with metrics.record_render(f'tag:{name}'):
+        return _original_render_annotated(self, context)
+
+
+def install():
+    Template._render = _render
+    Node.render_annotated = _render_annotated
+
+
+def uninstall():
+    Template._render = _original_render
+    Node.render_annotated = _original_render_annotated
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import resolve, reverse
+
+from core.db_router import use_replica
+from core.middleware import PRIMARY_COOKIE, ReplicaRoutingMiddleware
+from posts.models import Post
+
+User = get_user_model()
+
+REPLICA = 'replica_file'
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        """База, из которой view прочитал бы посты, и ответ."""
+        request.resolver_match = resolve(request.path)
+        used = []
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            used.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return used[0], response
+
+    def test_read_views_use_replica(self):
+        """Страницы чтения читают с реплики, остальные из default."""
+        self.assertEqual(
+            self.route(self.factory.get(reverse('posts:index')))[0],
+            'replica1')
+        self.assertEqual(
+            self.route(self.factory.get(reverse('posts:post_create')))[0],
+            'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_makes_reads_sticky(self):
+        """После записи пользователь читает свои данные из default."""
+        db, response = self.route(self.factory.post(
+            reverse('posts:post_create')))
+        self.assertEqual(db, 'default')
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        request = self.factory.get(
+            reverse('posts:profile', kwargs={'username': 'user'}))
+        request.COOKIES[PRIMARY_COOKIE] = response.cookies[
+            PRIMARY_COOKIE].value
+        self.assertEqual(self.route(request)[0], 'default')
+        request.COOKIES[PRIMARY_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.route(request)[0], 'replica1')
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_sessions_and_users_stay_on_primary(self):
+        """Сессии и пользователи не читаются с отстающей реплики."""
+        from django.contrib.auth.models import User
+        from django.contrib.sessions.models import Session
+
+        request = self.factory.get(reverse('posts:index'))
+        request.resolver_match = resolve(request.path)
+        middleware = ReplicaRoutingMiddleware(lambda request: None)
+        middleware.process_view(request, None, (), {})
+        try:
+            self.assertEqual(router.db_for_read(Session), 'default')
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+        finally:
+            use_replica(False)
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaFileTests(TestCase):
+    """Чтение с настоящей второй базой SQLite, а не зеркалом default."""
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        # Схема создаётся до транзакций TestCase: SQLite не меняет
+        # схему внутри atomic при включённых внешних ключах
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(User)
+            for model in apps.get_app_config('posts').get_models():
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        replica_author = User(username='replica-author')
+        replica_author.save(using=REPLICA)
+        Post.objects.using(REPLICA).bulk_create(
+            [Post(author=replica_author, text='Только на реплике')])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_reads_come_from_replica(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Только на реплике')
+
+    def test_read_after_write_uses_primary(self):
+        """Сразу после записи автор видит свой пост из default."""
+        self.client.post(reverse('posts:post_create'), {'text': 'Свой пост'})
+        self.assertIn(PRIMARY_COOKIE, self.client.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свой пост')
+        self.assertNotContains(response, 'Только на реплике')
+        self.client.cookies[PRIMARY_COOKIE] = str(time.time() - 1)
+        # Фрагмент ленты закэширован с данными default
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Только на реплике')
+        self.assertNotContains(response, 'Свой пост')
+
+    def test_follow_then_feed_uses_primary(self):
+        """Подписка по GET тоже переключает чтение ленты на default."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост автора')
+        response = self.client.get(
+            reverse('posts:profile_follow', args=(author.username,)),
+            follow=True)
+        self.assertIn(PRIMARY_COOKIE, self.client.cookies)
+        self.assertContains(response, 'Пост автора')
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(METRICS_SAMPLE_RATE=1)
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=author, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    def test_totals_by_view_name(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        index = metrics.registry.views['posts:index']
+        self.assertEqual(index['count'], 2)
+        self.assertGreater(index['queries'], 0)
+        self.assertGreater(index['query_time'], 0)
+        self.assertGreater(index['template_time'], 0)
+        # Промах кэша страницы и фрагмента, затем попадание в кэш страницы
+        self.assertEqual(dict(index['cache']), {'miss': 2, 'hit': 1})
+        self.assertEqual(
+            metrics.registry.views['posts:post_detail']['count'], 1)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(metrics.registry.views, {})
+
+    def test_prometheus_endpoint(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            body)
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index",result="miss"} 2',
+            body)
+
+    def test_endpoint_hidden_from_other_addresses(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(response.status_code, 404)
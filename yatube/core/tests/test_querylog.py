@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core import querylog
+from posts.models import Post
+
+User = get_user_model()
+
+
+class QueryShapeTests(TestCase):
+    def test_placeholder_lists_collapsed(self):
+        self.assertEqual(
+            querylog.query_shape('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            querylog.query_shape('SELECT 1 WHERE id IN (%s, %s)'))
+
+
+class QueryInspectorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(querylog.settings.NPLUSONE_THRESHOLD):
+            author = User.objects.create_user(username=f'author{number}')
+            Post.objects.create(author=author, text='Текст')
+
+    def inspect(self, load):
+        inspector = querylog.QueryInspector('test')
+        with connection.execute_wrapper(inspector):
+            load()
+        return inspector
+
+    def test_related_lookup_in_loop_detected(self):
+        inspector = self.inspect(
+            lambda: [post.author.username for post in Post.objects.all()])
+        [(shape, count, where)] = inspector.repeated()
+        self.assertIn('auth_user', shape)
+        self.assertIn('test_querylog.py', where)
+
+    def test_select_related_not_flagged(self):
+        inspector = self.inspect(lambda: [
+            post.author.username
+            for post in Post.objects.select_related('author')])
+        self.assertEqual(inspector.repeated(), [])
+
+    @override_settings(QUERY_INSPECTION='raise')
+    def test_raise_only_for_inspected_modules(self):
+        inspector = self.inspect(
+            lambda: [post.author.username for post in Post.objects.all()])
+        with self.assertLogs('yatube.queries', 'WARNING'):
+            inspector.report('about.views')
+        with self.assertLogs('yatube.queries', 'WARNING'):
+            with self.assertRaises(querylog.NPlusOneError):
+                inspector.report('posts.views')
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        with self.assertLogs('yatube.queries', 'WARNING') as logs:
+            self.inspect(lambda: list(Post.objects.all()))
+        self.assertIn('Slow query', logs.output[0])
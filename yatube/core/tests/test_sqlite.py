@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def connect(self):
+        """Новое соединение с файловой базой SQLite."""
+        default = connections['default']
+        settings_dict = dict(
+            default.settings_dict,
+            NAME=os.path.join(self.directory, 'test.sqlite3'))
+        wrapper = type(default)(settings_dict, alias='pragma_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=PRAGMAS)
+    def test_profile_applied_on_connect(self):
+        """PRAGMA профиля выполняются при открытии соединения."""
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+
+    def test_default_profile_keeps_journal(self):
+        """Пустой профиль не возвращает базу из WAL в журнал DELETE."""
+        with override_settings(SQLITE_PRAGMAS=PRAGMAS):
+            wal = self.connect()
+            self.assertEqual(self.pragma(wal, 'journal_mode'), 'wal')
+            wal.close()
+        with override_settings(SQLITE_PRAGMAS={}):
+            self.assertEqual(
+                self.pragma(self.connect(), 'journal_mode'), 'wal')
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL; DROP'})
+    def test_invalid_value_rejected(self):
+        with self.assertRaises(ValueError):
+            self.connect().ensure_connection()
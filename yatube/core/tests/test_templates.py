@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics, template_profiler
+from core.template_cache import precompile
+from posts.models import Post
+
+User = get_user_model()
+
+CACHED_TEMPLATES = [dict(
+    settings.TEMPLATES[0], APP_DIRS=False,
+    OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'], loaders=[
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]),
+)]
+
+
+class PrecompileTests(TestCase):
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_all_templates_cached(self):
+        self.assertGreater(precompile(), 0)
+        loader = engines.all()[0].engine.template_loaders[0]
+        for name in ('posts/index.html', 'posts/includes/paginator.html',
+                     'admin/base.html'):
+            self.assertIn(name, loader.get_template_cache)
+
+
+@override_settings(METRICS_SAMPLE_RATE=1)
+class TemplateProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        template_profiler.install()
+        self.addCleanup(template_profiler.uninstall)
+
+    def test_parts_by_view(self):
+        self.client.get(reverse('posts:index'))
+        render = metrics.registry.views['posts:index']['render']
+        for part in ('template:posts/index.html', 'template:base.html',
+                     'template:includes/header.html', 'tag:include',
+                     'tag:url', 'tag:fragment_cache'):
+            self.assertIn(part, render)
+        count, seconds = render['template:posts/index.html']
+        self.assertEqual(count, 1)
+        self.assertGreater(seconds, 0)
+        self.assertIn(
+            'yatube_render_part_seconds_total{view="posts:index",'
+            'part="template:posts/index.html"}',
+            metrics.registry.prometheus())
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(metrics.registry.views, {})
@@ -1,6 +1,36 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
-from .models import Group, Post
+from . import export, search
+from .models import Comment, Group, Post
+
+
+def export_action(table, file_format, compress):
+    """Действие админки: потоковая выгрузка выбранных строк."""
+    suffix = '.gz' if compress else ''
+    content_type = (
+        'application/gzip' if compress
+        else export.CONTENT_TYPES[file_format])
+
+    def action(modeladmin, request, queryset):
+        _, fields = export.EXPORTS[table]
+        response = StreamingHttpResponse(
+            export.stream(queryset, fields, file_format, compress=compress),
+            content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{table}.{file_format}{suffix}"')
+        return response
+    action.__name__ = f'export_{file_format}' + ('_gzip' if compress else '')
+    action.short_description = (
+        f'Выгрузить выбранное в {file_format.upper()}{suffix}')
+    return action
+
+
+def export_actions(table):
+    """Действия выгрузки table во всех форматах, со сжатием и без."""
+    return [export_action(table, file_format, compress)
+            for file_format in export.FORMATS
+            for compress in (False, True)]
 
 
 @admin.register(Group)
@@ -18,3 +48,19 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    actions = export_actions('posts')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.matching(queryset, search_term), False
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author',)
+    raw_id_fields = ('post', 'author')
+    search_fields = ('text',)
+    list_filter = ('created',)
+    actions = export_actions('comments')
@@ -0,0 +1,133 @@
+"""Кэш фрагментов страниц постов с инвалидацией по версиям.
+
+Ключ фрагмента содержит версии моделей, от которых он зависит.
+Запись Post, Group или Comment увеличивает версию своей модели,
+и все ранее сохранённые фрагменты перестают находиться, не дожидаясь
+истечения таймаута.
+
+Пересчёт фрагмента выполняется одним процессом (single flight):
+остальные в это время отдают устаревшую копию или ждут результата.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'posts:version:{}'
+FRAGMENT_KEY = 'posts:fragment:{}:{}:{}'
+LOCK_KEY = '{}:lock'
+STATS_KEY = 'posts:stats:{}:{}'
+
+# Модели, от которых зависят фрагменты; по умолчанию только посты.
+FRAGMENT_DEPENDENCIES = {
+    'index': ('post', 'group'),
+    'group_list': ('post', 'group'),
+}
+DEFAULT_DEPENDENCIES = ('post',)
+
+# Сколько секунд после истечения таймаута хранится устаревшая копия
+STALE_GRACE = 60
+# Сколько секунд пересчёт может держать блокировку
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_cache():
+    return caches[settings.POSTS_FRAGMENT_CACHE]
+
+
+def get_versions(scopes):
+    """Текущие версии данных для каждого из scopes."""
+    cache = get_cache()
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, 1, None)
+            found[key] = cache.get(key, 1)
+    return [found[key] for key in keys]
+
+
+def get_version(scope):
+    return get_versions([scope])[0]
+
+
+def bump_version(scope):
+    """Сбрасывает все фрагменты, зависящие от scope."""
+    cache = get_cache()
+    key = VERSION_KEY.format(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def fragment_key(name, vary_on):
+    scopes = FRAGMENT_DEPENDENCIES.get(name, DEFAULT_DEPENDENCIES)
+    version = '.'.join(str(v) for v in get_versions(scopes))
+    vary = hashlib.md5(
+        ':'.join(str(value) for value in vary_on).encode()).hexdigest()
+    return FRAGMENT_KEY.format(name, version, vary)
+
+
+def _count(name, outcome):
+    metrics.record_cache(outcome)
+    cache = get_cache()
+    key = STATS_KEY.format(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_or_compute(name, key, compute, timeout):
+    """Значение key из кэша; при промахе compute() вызывает один процесс.
+
+    Значение хранится вместе с моментом мягкого истечения и живёт
+    в кэше ещё STALE_GRACE секунд. Пока один процесс пересчитывает
+    устаревшее значение, остальные отдают старую копию; если копии нет,
+    они ждут результата не дольше LOCK_TIMEOUT.
+    """
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is not None and cached[0] > time.time():
+        _count(name, 'hit')
+        return cached[1]
+    lock = LOCK_KEY.format(key)
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        _count(name, 'miss')
+        logger.debug('Fragment %s recomputed (%s)', name, key)
+        try:
+            value = compute()
+            cache.set(
+                key, (time.time() + timeout, value), timeout + STALE_GRACE)
+        finally:
+            cache.delete(lock)
+        return value
+    if cached is not None:
+        _count(name, 'stale')
+        return cached[1]
+    deadline = time.time() + LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(name, 'hit')
+            return cached[1]
+    _count(name, 'miss')
+    return compute()
+
+
+def fragment_stats(name):
+    """Попадания, промахи и отдачи устаревших копий во всех процессах."""
+    cache = get_cache()
+    return {
+        outcome: cache.get(STATS_KEY.format(name, outcome), 0)
+        for outcome in ('hit', 'miss', 'stale')
+    }
@@ -0,0 +1,252 @@
+"""Отложенная запись комментариев (write-behind).
+
+При COMMENT_WRITE_BEHIND проверенный комментарий не вставляется
+в базу в запросе, а записывается файлом в каталог COMMENT_SPOOL_DIR.
+Фоновый поток раз в COMMENT_FLUSH_INTERVAL секунд забирает файлы
+и вставляет их пачкой в одной транзакции, так что запросы не ждут
+блокировку записи SQLite.
+
+Файл удаляется только после фиксации пачки, поэтому после сбоя
+комментарий будет вставлен повторно; уникальный idempotency_key
+не даёт появиться дублю. Пока комментарий в очереди, автор видит
+его на странице поста из кэша ожидающих комментариев; вставленные
+комментарии отсеиваются по ключу.
+
+Дата created у вставленного комментария — момент вставки пачки.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, freshness, stats
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'posts:pending-comments:{}:{}'
+# Сколько секунд автор видит свой комментарий до вставки в базу
+PENDING_TIMEOUT = 10 * 60
+SPOOL_SUFFIX = '.json'
+CLAIMED_SUFFIX = '.claimed'
+# Через сколько секунд взятый, но не вставленный файл снова в очереди
+CLAIM_TIMEOUT = 60
+
+_worker = None
+_lock = threading.Lock()
+
+
+def enabled():
+    return settings.COMMENT_WRITE_BEHIND
+
+
+def parse_key(value):
+    """UUID из формы или новый, если клиент не прислал верный ключ."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return uuid.uuid4()
+
+
+def _write(path, data):
+    """Записывает файл целиком и надёжно: через временный и rename."""
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def enqueue(post, author, text, key):
+    """Ставит комментарий в очередь и показывает его автору."""
+    created = timezone.now()
+    record = {
+        'key': str(key), 'post': post.pk, 'author': author.pk,
+        'text': text, 'created': created.isoformat(),
+    }
+    spool = settings.COMMENT_SPOOL_DIR
+    os.makedirs(spool, exist_ok=True)
+    _write(os.path.join(
+        spool, f'{time.time_ns():020d}-{key}{SPOOL_SUFFIX}'), record)
+    pending_key = PENDING_KEY.format(author.pk, post.pk)
+    store = cache.get_cache()
+    store.set(
+        pending_key, [*store.get(pending_key, []), record], PENDING_TIMEOUT)
+    freshness.touch(('post', post.pk))
+    start_worker()
+
+
+def pending(user, post, comments):
+    """Комментарии user к post из очереди, которых ещё нет в comments."""
+    if not user.is_authenticated:
+        return []
+    records = cache.get_cache().get(PENDING_KEY.format(user.pk, post.pk))
+    if not records:
+        return []
+    saved = {comment.idempotency_key for comment in comments}
+    return [
+        Comment(post=post, author=user, text=record['text'],
+                created=parse_datetime(record['created']),
+                idempotency_key=uuid.UUID(record['key']))
+        for record in records if uuid.UUID(record['key']) not in saved]
+
+
+def _claim_target(path):
+    """Имя, под которым файл path забирается, или None."""
+    if path.endswith(SPOOL_SUFFIX):
+        return path + CLAIMED_SUFFIX
+    if not path.endswith(CLAIMED_SUFFIX):
+        return None
+    # Файл взял процесс, который так и не вставил его
+    try:
+        stale = time.time() - os.path.getmtime(path) > CLAIM_TIMEOUT
+    except FileNotFoundError:
+        return None
+    return path if stale else None
+
+
+def _claim(batch_size):
+    """Забирает до batch_size файлов очереди, старые — первыми."""
+    spool = settings.COMMENT_SPOOL_DIR
+    try:
+        names = sorted(os.listdir(spool))
+    except FileNotFoundError:
+        return []
+    claimed = []
+    for name in names:
+        path = os.path.join(spool, name)
+        target = _claim_target(path)
+        if target is None:
+            continue
+        try:
+            os.replace(path, target)
+            os.utime(target)
+        except FileNotFoundError:
+            continue
+        claimed.append(target)
+        if len(claimed) >= batch_size:
+            break
+    return claimed
+
+
+def _release(paths):
+    for path in paths:
+        try:
+            os.replace(path, path[:-len(CLAIMED_SUFFIX)])
+        except FileNotFoundError:
+            pass
+
+
+def _insert(records):
+    """Вставляет records, пропуская уже вставленные и осиротевшие.
+
+    Возвращает вставленные комментарии. bulk_create не вызывает
+    сигналы, поэтому счётчики авторов сдвигаются здесь, в той же
+    транзакции, а кэш и даты изменения страниц — в _inserted().
+    """
+    keys = {uuid.UUID(record['key']) for record in records}
+    done = set(Comment.objects.filter(
+        idempotency_key__in=keys).values_list('idempotency_key', flat=True))
+    posts = set(Post.objects.filter(
+        pk__in={record['post'] for record in records}).values_list(
+            'pk', flat=True))
+    authors = User.objects.in_bulk(
+        {record['author'] for record in records})
+    comments = [
+        Comment(post_id=record['post'], author=authors[record['author']],
+                text=record['text'], idempotency_key=uuid.UUID(record['key']))
+        for record in records
+        if uuid.UUID(record['key']) not in done
+        and record['post'] in posts and record['author'] in authors]
+    Comment.objects.bulk_create(comments, ignore_conflicts=True)
+    for author_id, total in Counter(
+            comment.author_id for comment in comments).items():
+        stats.change(author_id, comments_count=total)
+    return comments
+
+
+def _inserted(comments):
+    """Сбрасывает кэш страниц после фиксации вставки comments."""
+    if not comments:
+        return
+    cache.bump_version('comment')
+    freshness.touch(
+        *{('post', comment.post_id) for comment in comments},
+        *{('author', comment.author_id) for comment in comments})
+
+
+def flush(batch_size=None):
+    """Разбирает пачку файлов очереди; возвращает их число."""
+    paths = _claim(batch_size or settings.COMMENT_FLUSH_BATCH)
+    if not paths:
+        return 0
+    records = []
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as file:
+                records.append(json.load(file))
+        except ValueError:
+            logger.error('Broken comment spool file %s dropped', path)
+    try:
+        with transaction.atomic():
+            comments = _insert(records)
+            # До фиксации другие запросы перечитали бы старые данные
+            # и снова положили их в кэш
+            transaction.on_commit(lambda: _inserted(comments))
+    except Exception:
+        _release(paths)
+        raise
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Файл уже разобрал другой процесс после CLAIM_TIMEOUT
+            pass
+    logger.debug('Flushed %s queued comments', len(comments))
+    return len(paths)
+
+
+def flush_all():
+    """Опустошает очередь; возвращает число разобранных файлов."""
+    total = 0
+    while True:
+        done = flush()
+        if not done:
+            return total
+        total += done
+
+
+def _run():
+    while True:
+        time.sleep(settings.COMMENT_FLUSH_INTERVAL)
+        try:
+            flush_all()
+        except Exception:
+            logger.exception('Comment flush failed, will retry')
+        finally:
+            connection.close()
+
+
+def start_worker():
+    """Запускает фоновый поток вставки, если он нужен и ещё не запущен.
+
+    При COMMENT_FLUSH_INTERVAL = 0 очередь разбирает только команда
+    flush_comments.
+    """
+    global _worker
+    if not settings.COMMENT_FLUSH_INTERVAL:
+        return
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run, name='comment-flush', daemon=True)
+            _worker.start()
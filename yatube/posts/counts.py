@@ -0,0 +1,51 @@
+"""Кэшированное число постов в списках для классической паджинации.
+
+Число постов главной, группы, автора и ленты подписок хранится в кэше,
+чтобы COUNT(*) по большой таблице не выполнялся на каждый запрос
+?page=N. Сигналы записи удаляют счётчики затронутых списков, а
+массовые операции в обход сигналов сбрасывают все счётчики разом
+увеличением версии 'count'.
+"""
+from .cache import bump_version, get_cache, get_version
+from .models import Follow
+
+COUNT_KEY = 'posts:count:{}:{}:{}'
+# Подстраховка от расхождения, если запись прошла мимо сигналов
+COUNT_TIMEOUT = 60 * 60
+
+
+def _key(kind, key):
+    return COUNT_KEY.format(get_version('count'), kind, key)
+
+
+def cached_count(scope, queryset):
+    """Число строк queryset, закэшированное под scope вида ('group', pk)."""
+    cache = get_cache()
+    key = _key(*scope)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_TIMEOUT)
+    return count
+
+
+def invalidate(*scopes):
+    get_cache().delete_many([_key(kind, key) for kind, key in scopes])
+
+
+def invalidate_all():
+    bump_version('count')
+
+
+def post_changed(post, group_ids=(), created=True):
+    """Сбрасывает счётчики списков, в которые входит post.
+
+    Главная, автор и ленты подписчиков меняются только при появлении
+    и удалении поста; при редактировании — только группы.
+    """
+    scopes = [('group', pk) for pk in {post.group_id, *group_ids} - {None}]
+    if created:
+        scopes += [('index', ''), ('author', post.author_id)]
+        scopes += [('feed', user_id) for user_id in Follow.objects.filter(
+            author_id=post.author_id).values_list('user_id', flat=True)]
+    invalidate(*scopes)
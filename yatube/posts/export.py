@@ -0,0 +1,81 @@
+"""Потоковая выгрузка постов и комментариев в NDJSON и CSV.
+
+Строки читаются из базы через iterator(chunk_size) в порядке id и
+сразу превращаются в текст, поэтому память не растёт с размером
+таблицы. Каждая строка содержит id, и прерванную выгрузку можно
+продолжить с after_id, равным последнему полученному id.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+# 16 + MAX_WBITS: поток в формате gzip
+GZIP_WBITS = 31
+
+EXPORTS = {
+    'posts': (Post, (
+        'id', 'pub_date', 'author__username', 'group__slug', 'text',
+        'image')),
+    'comments': (Comment, (
+        'id', 'post_id', 'author__username', 'created', 'text')),
+}
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def rows(queryset, fields, after_id=0, chunk_size=CHUNK_SIZE):
+    """Словари fields по возрастанию id, начиная после after_id."""
+    return queryset.filter(pk__gt=after_id).order_by('pk').values(
+        *fields).iterator(chunk_size=chunk_size)
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(
+            {key: _value(value) for key, value in record.items()},
+            ensure_ascii=False) + '\n'
+
+
+class _Line:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records, fields):
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields)
+    for record in records:
+        yield writer.writerow(_value(record[field]) for field in fields)
+
+
+def gzip_chunks(lines):
+    """Сжимает поток строк в gzip, не накапливая его целиком."""
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    for line in lines:
+        chunk = compressor.compress(line.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def stream(queryset, fields, file_format='ndjson', compress=False,
+           after_id=0, chunk_size=CHUNK_SIZE):
+    """Выгрузка queryset: строки str или, при compress, байты gzip."""
+    records = rows(queryset, fields, after_id, chunk_size)
+    if file_format == 'csv':
+        lines = csv_lines(records, fields)
+    else:
+        lines = ndjson_lines(records)
+    return gzip_chunks(lines) if compress else lines
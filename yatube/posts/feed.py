@@ -0,0 +1,66 @@
+"""Лента подписок с раскладкой при записи (fan-out-on-write)."""
+from django.db import connection, transaction
+
+from .models import FeedEntry, Follow, Post
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts.iterator()],
+        ignore_conflicts=True)
+
+
+def drop(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def _insert_select(cursor, where='', params=()):
+    cursor.execute(
+        f'INSERT INTO {FeedEntry._meta.db_table} '
+        f'(user_id, post_id, pub_date) '
+        f'SELECT follow.user_id, post.id, post.pub_date '
+        f'FROM {Follow._meta.db_table} follow '
+        f'JOIN {Post._meta.db_table} post '
+        f'ON post.author_id = follow.author_id {where}', params)
+
+
+def fan_out_range(first_pk, last_pk):
+    """Раскладывает посты с id из диапазона одним INSERT ... SELECT.
+
+    Посты, уже разложенные сигналами, пропускаются.
+    """
+    with connection.cursor() as cursor:
+        _insert_select(
+            cursor,
+            f'WHERE post.id BETWEEN %s AND %s AND NOT EXISTS ('
+            f'SELECT 1 FROM {FeedEntry._meta.db_table} entry '
+            f'WHERE entry.user_id = follow.user_id '
+            f'AND entry.post_id = post.id)',
+            [first_pk, last_pk])
+
+
+def rebuild():
+    """Полностью пересобирает ленты по текущим подпискам.
+
+    Записи ленты вставляются одним INSERT ... SELECT, без выгрузки
+    постов в Python, поэтому пересборка годится и для больших баз.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        FeedEntry.objects.all().delete()
+        _insert_select(cursor)
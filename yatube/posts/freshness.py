@@ -0,0 +1,163 @@
+"""Условные GET-запросы (ETag и Last-Modified) для страниц постов.
+
+Для каждой группы, автора и поста в кэше хранится момент последнего
+изменения того, что показывает их страница. Сигналы записи обновляют
+его, а страница сравнивает его с заголовками клиента до выполнения
+view и при совпадении отвечает 304 без запросов к спискам постов и
+без отрисовки шаблона. Если момента в кэше нет, он восстанавливается
+по датам постов и комментариев в базе; для несуществующего объекта
+ничего не кэшируется, а страница отдаётся без ETag. Автор
+обозначается первичным ключом, чтобы сигналы не загружали
+пользователя ради username.
+
+ETag включает пользователя и CSRF-cookie, потому что от них зависит
+шапка и форма комментария. Last-Modified отдаётся только гостям:
+по нему нельзя отличить страницу, показанную до входа на сайт.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import DateTimeField, Max, OuterRef, Subquery
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .cache import get_cache, get_versions
+from .models import Comment, Group, Post, User
+
+CHANGED_KEY = 'posts:changed:{}:{}'
+# Версии моделей, изменение которых затрагивает все страницы
+GLOBAL_SCOPES = ('group',)
+
+
+def _latest(queryset, **fields):
+    """Самая поздняя из дат fields одной строки queryset.
+
+    None, если строки нет; сейчас, если у неё нет ни одной даты.
+    """
+    row = queryset.annotate(**{
+        name: Subquery(
+            model.objects.filter(**{lookup: OuterRef('pk')}).order_by(
+            ).values(lookup).annotate(latest=Max(field)).values('latest'),
+            output_field=DateTimeField())
+        for name, (model, lookup, field) in fields.items()
+    }).values_list(*fields).first()
+    if row is None:
+        return None
+    return max(filter(None, row), default=None) or timezone.now()
+
+
+FALLBACKS = {
+    'post': lambda pk: _latest(
+        Post.objects.filter(pk=pk),
+        post=(Post, 'pk', 'pub_date'),
+        comment=(Comment, 'post', 'created')),
+    'group': lambda slug: _latest(
+        Group.objects.filter(slug=slug),
+        post=(Post, 'group', 'pub_date')),
+    'author': lambda pk: _latest(
+        User.objects.filter(pk=pk),
+        post=(Post, 'author', 'pub_date'),
+        comment=(Comment, 'author', 'created')),
+}
+
+
+def touch(*scopes):
+    """Отмечает scopes вида ('group', slug) изменёнными сейчас."""
+    now = timezone.now().timestamp()
+    get_cache().set_many(
+        {CHANGED_KEY.format(kind, key): now for kind, key in scopes}, None)
+
+
+def last_changed(scopes):
+    """Самый поздний момент изменения scopes как timestamp.
+
+    None, если объекта одного из scopes нет в базе.
+    """
+    cache = get_cache()
+    keys = {CHANGED_KEY.format(kind, key): (kind, key) for kind, key in scopes}
+    found = cache.get_many(list(keys))
+    for cache_key, (kind, key) in keys.items():
+        if cache_key not in found:
+            latest = FALLBACKS[kind](key)
+            if latest is None:
+                return None
+            cache.add(cache_key, latest.timestamp(), None)
+            found[cache_key] = cache.get(cache_key, latest.timestamp())
+    return max(found.values())
+
+
+def post_changed(post, group_ids=()):
+    """Отмечает изменёнными страницы поста, его автора и групп."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    touch(
+        ('post', post.pk), ('author', post.author_id),
+        *(('group', slug) for slug in Group.objects.filter(
+            pk__in=group_ids).values_list('slug', flat=True)))
+
+
+def group_page(slug):
+    return [('group', slug)]
+
+
+def profile_page(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    return [('author', author_id)]
+
+
+def post_page(post_id):
+    """Пост и автор: на странице поста есть счётчик постов автора."""
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True).first()
+    if author_id is None:
+        return None
+    return [('post', post_id), ('author', author_id)]
+
+
+def conditional(resolve_scopes):
+    """Декоратор view с ETag и Last-Modified по изменениям scopes.
+
+    resolve_scopes(**view_kwargs) возвращает список scopes страницы
+    или None, если её объекта нет; тогда view выполняется как обычно.
+    Ответы с ошибкой уходят без ETag и Last-Modified, чтобы клиент
+    не получал 304 на страницу, которой нет.
+    """
+    def state(request, **kwargs):
+        if not hasattr(request, 'last_changed'):
+            scopes = resolve_scopes(**kwargs)
+            request.last_changed = (
+                None if scopes is None else last_changed(scopes))
+        return request.last_changed
+
+    def etag(request, **kwargs):
+        changed = state(request, **kwargs)
+        if changed is None:
+            return None
+        raw = ':'.join(str(part) for part in (
+            changed, *get_versions(GLOBAL_SCOPES),
+            request.user.pk, request.COOKIES.get('csrftoken', ''),
+            request.get_full_path()))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        changed = state(request, **kwargs)
+        if changed is None or request.user.is_authenticated:
+            return None
+        return datetime.fromtimestamp(changed, timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code >= 400:
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+    return decorator
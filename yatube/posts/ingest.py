@@ -0,0 +1,250 @@
+"""Массовый импорт постов из NDJSON.
+
+Каждая строка — объект поста:
+{"author": "leo", "text": "...", "group": "slug", "pub_date": "...",
+"image": "cat.jpg"}. Поля совпадают с выгрузкой export_data, поэтому
+её файл можно загрузить обратно. Текст и картинка проверяются
+правилами PostForm, неверные строки пропускаются и попадают в отчёт.
+
+Посты вставляются через bulk_create пачками, каждая в своей
+транзакции, поэтому сигналы не срабатывают: ленты, счётчики авторов,
+миниатюры и кэш доводятся до актуального состояния один раз
+в finalize() после всех пачек.
+"""
+import json
+import os
+from itertools import islice
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, counts, feed, freshness, stats, thumbnails
+from .forms import PostForm
+from .models import Group, Post, User
+from .synthetic import bulk_create
+
+BATCH_SIZE = 1000
+# Сколько ошибок хранить для отчёта; остальные только считаются
+MAX_REPORTED_ERRORS = 100
+# Поля строки, которые должны быть строками: по ним ищутся объекты
+STRING_FIELDS = (
+    'author', 'author__username', 'group', 'group__slug', 'image',
+    'pub_date')
+
+
+class ImportForm(PostForm):
+    """Правила PostForm для текста и картинки; группа ищется по slug."""
+
+    class Meta(PostForm.Meta):
+        fields = ('text', 'image')
+
+
+class LazyFile(File):
+    """Файл картинки, который держит дескриптор только во время чтения.
+
+    Файл открывается при первом обращении и закрывается после
+    проверки формой и после записи в хранилище, поэтому пачка
+    не держит открытыми файлы всех своих строк.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        super().__init__(None, name=os.path.basename(path))
+
+    @property
+    def file(self):
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        return self._file
+
+    @file.setter
+    def file(self, value):
+        self._file = value
+
+    @property
+    def closed(self):
+        return self._file is None or self._file.closed
+
+    def chunks(self, chunk_size=None):
+        try:
+            yield from super().chunks(chunk_size)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Importer:
+    """Импортирует строки NDJSON пачками и запоминает, что изменилось.
+
+    author задаёт автора всех постов (импорт через API); иначе автор
+    берётся из поля author строки. Картинки ищутся в files по имени
+    или в каталоге images_dir. При keep_dates сохраняется pub_date
+    из строки. При schedule_variants варианты картинок ставятся
+    в фоновую очередь после импорта; иначе их создаёт команда
+    regenerate_image_variants.
+    """
+
+    def __init__(self, author=None, images_dir=None, files=None,
+                 batch_size=BATCH_SIZE, keep_dates=False,
+                 schedule_variants=True):
+        self.author = author
+        self.images_dir = images_dir
+        self.files = files or {}
+        self.batch_size = batch_size
+        self.keep_dates = keep_dates
+        self.schedule_variants = schedule_variants
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.created = 0
+        self.failed = 0
+        self.images = 0
+        self.errors = []
+        self.first_pk = None
+        self.last_pk = None
+        self.authors = set()
+        self.group_ids = set()
+
+    def run(self, lines):
+        """Импортирует все строки и доводит производные данные."""
+        numbered = enumerate(lines, 1)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+        self.finalize()
+        return self
+
+    def error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': number, 'errors': errors})
+
+    def decode(self, number, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            self.error(number, {'__all__': ['Строка не является объектом']})
+            return None
+        errors = {
+            field: ['Значение должно быть строкой'] for field in STRING_FIELDS
+            if record.get(field) is not None
+            and not isinstance(record[field], str)}
+        if errors:
+            self.error(number, errors)
+            return None
+        return record
+
+    def image(self, name):
+        """Файл картинки name или None, если его нет."""
+        if name in self.files:
+            return self.files[name]
+        if self.images_dir is None:
+            return None
+        path = os.path.join(self.images_dir, name)
+        if not os.path.isfile(path):
+            return None
+        return LazyFile(path)
+
+    @staticmethod
+    def parse_date(value):
+        try:
+            value = parse_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def build(self, number, record, authors):
+        """Пост из строки record или None с ошибкой в отчёте."""
+        errors = {}
+        author = self.author or authors.get(
+            record.get('author', record.get('author__username')))
+        if author is None:
+            errors['author'] = ['Автор не найден']
+        slug = record.get('group', record.get('group__slug'))
+        if slug and slug not in self.groups:
+            errors['group'] = ['Группа не найдена']
+        pub_date = timezone.now()
+        if self.keep_dates and record.get('pub_date'):
+            pub_date = self.parse_date(record['pub_date'])
+            if pub_date is None:
+                errors['pub_date'] = ['Неверная дата']
+        files = {}
+        if record.get('image'):
+            files['image'] = self.image(record['image'])
+            if files['image'] is None:
+                errors['image'] = ['Картинка не найдена']
+        form = ImportForm({'text': record.get('text')}, files)
+        valid = form.is_valid()
+        if isinstance(files.get('image'), LazyFile):
+            files['image'].close()
+        if errors or not valid:
+            self.error(number, {**form.errors, **errors})
+            return None
+        post = form.save(commit=False)
+        post.author = author
+        post.group_id = self.groups.get(slug)
+        post.pub_date = pub_date
+        return post
+
+    def import_batch(self, batch):
+        records = [
+            (number, record) for number, record in (
+                (number, self.decode(number, line)) for number, line in batch)
+            if record is not None]
+        authors = {}
+        if self.author is None:
+            authors = User.objects.in_bulk(
+                {record.get('author', record.get('author__username'))
+                 for _, record in records} - {None},
+                field_name='username')
+        posts = [self.build(number, record, authors)
+                 for number, record in records]
+        posts = [post for post in posts if post is not None]
+        if not posts:
+            return
+        with transaction.atomic():
+            pks = bulk_create(
+                Post, posts, self.batch_size,
+                dates='pub_date' if self.keep_dates else None)
+        if pks:
+            self.first_pk = pks[0] if self.first_pk is None else self.first_pk
+            self.last_pk = pks[-1]
+        self.created += len(posts)
+        self.images += sum(1 for post in posts if post.image)
+        self.authors.update(post.author for post in posts)
+        self.group_ids.update(post.group_id for post in posts)
+
+    def finalize(self):
+        """Ленты, счётчики, варианты картинок и кэш после всех пачек."""
+        if not self.created:
+            return
+        feed.fan_out_range(self.first_pk, self.last_pk)
+        stats.rebuild(author_ids=[author.pk for author in self.authors])
+        cache.bump_version('post')
+        counts.invalidate_all()
+        freshness.touch(
+            *(('author', author.pk) for author in self.authors),
+            *(('group', slug) for slug, pk in self.groups.items()
+              if pk in self.group_ids))
+        if not self.schedule_variants:
+            return
+        with_images = Post.objects.filter(
+            pk__range=(self.first_pk, self.last_pk)).exclude(
+                image='').values_list('pk', flat=True)
+        for pk in with_images.iterator():
+            thumbnails.schedule_on_commit(thumbnails.generate_variants, pk)
@@ -0,0 +1,192 @@
+"""Нагрузочное тестирование yatube по именованным маршрутам.
+
+Сценарий — функция, которая ходит по сайту от имени виртуального
+пользователя через маршруты posts.urls и users.urls. Время каждого
+запроса записывается под именем маршрута, а не URL, поэтому
+/posts/1/ и /posts/2/ попадают в одну строку отчёта post_detail.
+"""
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urljoin
+
+import requests
+from django.urls import reverse
+
+REQUEST_TIMEOUT = 30
+COMMENT_TEXT = 'Комментарий нагрузочного теста'
+
+
+def percentile(timings, share):
+    """Значение, не меньше которого share долей отсортированных timings."""
+    if not timings:
+        return 0
+    index = max(math.ceil(share * len(timings)) - 1, 0)
+    return timings[index]
+
+
+class Recorder:
+    """Собирает время ответов и ошибки по именам маршрутов."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, name, elapsed, ok):
+        with self.lock:
+            if ok:
+                self.timings[name].append(elapsed)
+            else:
+                self.errors[name] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self):
+        """Строки отчёта: маршрут, запросы, ошибки, p50/p95/p99 в мс, rps."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rows = []
+        for name in sorted(set(self.timings) | set(self.errors)):
+            timings = sorted(self.timings[name])
+            rows.append({
+                'name': name,
+                'count': len(timings),
+                'errors': self.errors[name],
+                'p50': percentile(timings, 0.50) * 1000,
+                'p95': percentile(timings, 0.95) * 1000,
+                'p99': percentile(timings, 0.99) * 1000,
+                'rps': len(timings) / elapsed if elapsed else 0,
+            })
+        return rows
+
+
+class VirtualUser:
+    """Сессия requests, которая обращается к сайту по именам маршрутов."""
+
+    def __init__(self, base_url, recorder, data, rng):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.data = data
+        self.rng = rng
+        self.session = requests.Session()
+
+    def pick(self, kind):
+        """Случайный объект kind из загруженных данных или None."""
+        values = self.data.get(kind)
+        return self.rng.choice(values) if values else None
+
+    def request(self, method, name, args=(), data=None, expected=200):
+        """Запрос к маршруту name; ответ с другим кодом — ошибка.
+
+        Переадресация, которой маршрут не ждёт (например, на вход
+        после потери сессии), тоже считается ошибкой.
+        """
+        if any(arg is None for arg in args):
+            return None
+        url = urljoin(self.base_url, reverse(name, args=args))
+        headers = {}
+        if method == 'POST':
+            data = dict(
+                data or {},
+                csrfmiddlewaretoken=self.session.cookies.get('csrftoken', ''))
+            headers['Referer'] = url
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, url, data=data, headers=headers,
+                allow_redirects=False, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException:
+            self.recorder.add(name, None, False)
+            return None
+        self.recorder.add(
+            name, time.perf_counter() - started,
+            response.status_code == expected)
+        return response
+
+    def get(self, name, *args, expected=200):
+        return self.request('GET', name, args, expected=expected)
+
+    def post(self, name, data, *args, expected=302):
+        return self.request('POST', name, args, data, expected)
+
+    def login(self, username, password):
+        self.get('users:login')
+        response = self.post(
+            'users:login', {'username': username, 'password': password})
+        return response is not None and response.status_code == 302
+
+
+def browse(user):
+    """Гость листает ленты и открывает пост."""
+    user.get('posts:index')
+    user.get('posts:group_list', user.pick('groups'))
+    user.get('posts:profile', user.pick('authors'))
+    user.get('posts:post_detail', user.pick('posts'))
+
+
+def comment(user):
+    """Пользователь открывает пост и комментирует его."""
+    post_id = user.pick('posts')
+    user.get('posts:post_detail', post_id)
+    user.post('posts:add_comment', {'text': COMMENT_TEXT}, post_id)
+
+
+def follow(user):
+    """Пользователь подписывается на автора, читает ленту и отписывается."""
+    author = user.pick('authors')
+    user.get('posts:profile_follow', author, expected=302)
+    user.get('posts:follow_index')
+    user.get('posts:profile_unfollow', author, expected=302)
+
+
+def feed(user):
+    """Пользователь читает ленту подписок."""
+    user.get('posts:follow_index')
+
+
+SCENARIOS = {
+    'browse': browse,
+    'comment': comment,
+    'follow': follow,
+    'feed': feed,
+}
+# Сценарии, которым нужен вошедший пользователь
+AUTHENTICATED_SCENARIOS = {'comment', 'follow', 'feed'}
+
+
+def run(base_url, scenarios, data, concurrency=10, duration=30,
+        credentials=(), seed=None):
+    """Гоняет scenarios в concurrency потоках duration секунд.
+
+    Поток i входит на сайт под credentials[i % len(credentials)],
+    если учётные данные переданы; поток, который не смог войти,
+    останавливается, а ошибка остаётся в строке users:login.
+    Возвращает Recorder с замерами.
+    """
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        rng = random.Random(None if seed is None else seed + number)
+        user = VirtualUser(base_url, recorder, data, rng)
+        if credentials and not user.login(
+                *credentials[number % len(credentials)]):
+            return
+        while time.perf_counter() < deadline:
+            SCENARIOS[rng.choice(scenarios)](user)
+
+    threads = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorder.stop()
+    return recorder
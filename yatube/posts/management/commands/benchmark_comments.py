@@ -0,0 +1,118 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts import commentqueue
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = 'benchmark'
+BENCHMARK_TEXT = 'Комментарий нагрузочного теста'
+# Адрес не из INTERNAL_IPS, чтобы debug toolbar не искажал замер
+BENCHMARK_ADDR = '192.0.2.1'
+
+
+def _measure(client, request, deadline):
+    """Повторяет request(client) до deadline; время ответов и ошибки."""
+    timings = []
+    errors = 0
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            response = request(client)
+        except Exception:
+            errors += 1
+            continue
+        if response.status_code >= 400:
+            errors += 1
+            continue
+        timings.append(time.monotonic() - started)
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = ('Измеряет скорость чтения страницы поста, пока другие потоки '
+            'пишут комментарии через add_comment. Пишет в настроенную '
+            'базу, запускайте на копии данных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='длительность замера в секундах')
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='число читающих потоков')
+        parser.add_argument(
+            '--writers', type=int, default=2,
+            help='число пишущих потоков')
+        parser.add_argument(
+            '--write-behind', action='store_true',
+            help='писать комментарии через очередь отложенной записи')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        post = Post.objects.order_by('-pub_date').first()
+        if post is None:
+            post = Post.objects.create(author=user, text=BENCHMARK_TEXT)
+        detail_url = reverse('posts:post_detail', args=(post.pk,))
+        comment_url = reverse('posts:add_comment', args=(post.pk,))
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        connection.close()
+
+        deadline = time.monotonic() + options['duration']
+        results = {'read': [], 'write': [], 'error': 0}
+        lock = threading.Lock()
+
+        def run(kind, request):
+            client = Client(REMOTE_ADDR=BENCHMARK_ADDR)
+            if kind == 'write':
+                client.force_login(user)
+            try:
+                timings, errors = _measure(client, request, deadline)
+            finally:
+                connection.close()
+            with lock:
+                results[kind].extend(timings)
+                results['error'] += errors
+
+        threads = [
+            threading.Thread(target=run, args=(
+                'read', lambda client: client.get(detail_url)))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=run, args=(
+                'write', lambda client: client.post(
+                    comment_url, {'text': BENCHMARK_TEXT})))
+            for _ in range(options['writers'])
+        ]
+        with override_settings(
+                COMMENT_WRITE_BEHIND=options['write_behind']):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        commentqueue.flush_all()
+        Comment.objects.filter(author=user, text=BENCHMARK_TEXT).delete()
+
+        self.stdout.write(
+            f'journal_mode: {journal_mode}, '
+            f'write-behind: {options["write_behind"]}')
+        for kind in ('read', 'write'):
+            timings = results[kind]
+            rate = len(timings) / options['duration']
+            p95 = (statistics.quantiles(timings, n=20)[-1] * 1000
+                   if len(timings) > 1 else 0)
+            self.stdout.write(
+                f'{kind}: {len(timings)} запросов, {rate:.1f}/с, '
+                f'p95 {p95:.1f} мс')
+        style = self.style.ERROR if results['error'] else self.style.SUCCESS
+        self.stdout.write(style(f'Ошибок: {results["error"]}'))
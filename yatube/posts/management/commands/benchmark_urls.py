@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Template
+from django.urls import reverse
+
+from posts import urlbuilder
+from posts.models import Post
+
+# Карточка поста из списков: три адреса на пост, как в index.html
+CARD_REVERSE = (
+    "{% for post in posts %}"
+    "<a href=\"{% url 'posts:profile' post.author.username %}\"></a>"
+    "<a href=\"{% url 'posts:post_detail' post.pk %}\"></a>"
+    "{% if post.group %}"
+    "<a href=\"{% url 'posts:group_list' post.group.slug %}\"></a>"
+    "{% endif %}{% endfor %}"
+)
+CARD_FAST = (
+    "{% load posts_urls %}{% for post in posts %}"
+    "<a href=\"{% fast_url 'posts:profile' post.author.username %}\"></a>"
+    "<a href=\"{{ post.get_absolute_url }}\"></a>"
+    "{% if post.group %}"
+    "<a href=\"{{ post.group.get_absolute_url }}\"></a>"
+    "{% endif %}{% endfor %}"
+)
+
+
+def _timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает reverse() и posts.urlbuilder на адресах постов '
+            'и на отрисовке списка постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=2000,
+            help='сколько раз строить каждый адрес')
+        parser.add_argument(
+            '--posts', type=int, default=10,
+            help='постов на странице списка')
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.select_related('author', 'group').exclude(
+            group=None)[:options['posts']])
+        if not posts:
+            raise CommandError('Нет постов с группой, запустите generate_data')
+        post = posts[0]
+        routes = (
+            ('posts:index', ()),
+            ('posts:profile', (post.author.username,)),
+            ('posts:post_detail', (post.pk,)),
+            ('posts:group_list', (post.group.slug,)),
+        )
+        repeat = options['repeat']
+        self.stdout.write(
+            f'{"адрес":<20}{"reverse, мкс":>14}{"builder, мкс":>14}'
+            f'{"ускорение":>11}')
+        for name, route_args in routes:
+            expected = reverse(name, args=route_args)
+            if urlbuilder.build(name, *route_args) != expected:
+                raise CommandError(f'{name}: адреса не совпадают')
+            slow = _timed(lambda: reverse(name, args=route_args), repeat)
+            fast = _timed(
+                lambda: urlbuilder.build(name, *route_args), repeat)
+            self.stdout.write(
+                f'{name:<20}{slow * 1e6:>14.1f}{fast * 1e6:>14.1f}'
+                f'{slow / fast:>10.1f}x')
+
+        context = Context({'posts': posts})
+        pages = {
+            'url': Template(CARD_REVERSE),
+            'fast_url': Template(CARD_FAST),
+        }
+        if pages['url'].render(context) != pages['fast_url'].render(context):
+            raise CommandError('Страницы списка не совпадают')
+        renders = max(repeat // 100, 1)
+        timings = {
+            tag: _timed(lambda: page.render(context), renders)
+            for tag, page in pages.items()}
+        self.stdout.write(
+            f'Отрисовка {len(posts)} карточек: '
+            f'url {timings["url"] * 1000:.2f} мс, '
+            f'fast_url {timings["fast_url"] * 1000:.2f} мс '
+            f'({timings["url"] / timings["fast_url"]:.1f}x)')
@@ -0,0 +1,106 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+# Адрес не из INTERNAL_IPS, чтобы debug toolbar не искажал замер
+BENCHMARK_ADDR = '192.0.2.1'
+DEEP_PAGE = 50
+
+
+def _targets():
+    """Страницы posts.views на самых тяжёлых для них объектах."""
+    group = Group.objects.annotate(
+        total=Count('posts')).order_by('-total').first()
+    author = User.objects.order_by('-stats__posts_count').first()
+    reader = User.objects.order_by('-stats__following_count').first()
+    post = Post.objects.annotate(
+        total=Count('comments')).order_by('-total').first()
+    word = post.text.split()[0] if post else ''
+    targets = [
+        ('index', reverse('posts:index'), None),
+        ('index ?page=N', reverse('posts:index') + f'?page={DEEP_PAGE}',
+         None),
+    ]
+    if group:
+        targets.append(('group_list', reverse(
+            'posts:group_list', args=(group.slug,)), None))
+    if author:
+        targets.append(('profile', reverse(
+            'posts:profile', args=(author.username,)), None))
+    if post:
+        targets.append(('post_detail', reverse(
+            'posts:post_detail', args=(post.pk,)), None))
+    if reader:
+        targets.append(('follow_index', reverse('posts:follow_index'), reader))
+    targets.append(('search', reverse('posts:search') + f'?q={word}', None))
+    return targets
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время и число запросов каждой страницы posts.views. '
+            'С --scales база дополняется generate_data до нужного числа '
+            'постов и замер повторяется на каждом объёме.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='',
+            help='числа постов через запятую, например 10000,100000,1000000')
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='сколько раз запрашивать каждую страницу')
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='не очищать кэш перед запросами')
+        parser.add_argument('--seed', type=int, help='зерно generate_data')
+
+    def measure(self, url, user, repeat, warm):
+        client = Client(REMOTE_ADDR=BENCHMARK_ADDR)
+        if user is not None:
+            client.force_login(user)
+        timings = []
+        for _ in range(repeat):
+            if not warm:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                client.get(url)
+                timings.append(time.perf_counter() - started)
+        return timings, len(queries)
+
+    def benchmark(self, repeat, warm):
+        scale = Post.objects.count()
+        for name, url, user in _targets():
+            timings, queries = self.measure(url, user, repeat, warm)
+            p95 = (statistics.quantiles(timings, n=20)[-1]
+                   if len(timings) > 1 else timings[0])
+            self.stdout.write(
+                f'{scale:>9} {name:<16}'
+                f'{statistics.median(timings) * 1000:>10.1f}'
+                f'{p95 * 1000:>10.1f}{queries:>9}')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"постов":>9} {"страница":<16}{"медиана":>10}{"p95":>10}'
+            f'{"запросы":>9}')
+        scales = [int(scale) for scale in options['scales'].split(',')
+                  if scale]
+        if not scales:
+            self.benchmark(options['repeat'], options['warm'])
+            return
+        for scale in sorted(scales):
+            missing = scale - Post.objects.count()
+            if missing > 0:
+                call_command(
+                    'generate_data', posts=missing, seed=options['seed'],
+                    stdout=self.stderr)
+            self.benchmark(options['repeat'], options['warm'])
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты или комментарии в NDJSON или CSV. '
+            'Прерванную выгрузку можно продолжить с --after')
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--gzip', action='store_true', help='сжимать вывод в gzip')
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='выгружать строки с id больше этого')
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE,
+            help='строк в одной выборке из базы')
+        parser.add_argument(
+            '--output', help='файл для записи, по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        model, fields = export.EXPORTS[options['table']]
+        chunks = export.stream(
+            model.objects.all(), fields, options['format'],
+            compress=options['gzip'], after_id=options['after'],
+            chunk_size=options['chunk_size'])
+        if options['output']:
+            mode = 'wb' if options['gzip'] else 'w'
+            encoding = None if options['gzip'] else 'utf-8'
+            with open(options['output'], mode, encoding=encoding,
+                      newline=None if options['gzip'] else '') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        elif options['gzip']:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
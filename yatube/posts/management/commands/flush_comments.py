@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import commentqueue
+
+
+class Command(BaseCommand):
+    help = 'Вставляет в базу комментарии из очереди отложенной записи'
+
+    def handle(self, *args, **options):
+        done = commentqueue.flush_all()
+        self.stdout.write(f'Разобрано файлов очереди: {done}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша фрагментов страниц постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'fragments', nargs='*', default=['index', 'group_list', 'page'],
+            help='имена фрагментов из тега fragment_cache; '
+                 'page — полностраничный кэш для гостей')
+
+    def handle(self, *args, **options):
+        for name in options['fragments']:
+            stats = cache.fragment_stats(name)
+            total = sum(stats.values())
+            rate = (stats['hit'] + stats['stale']) / total if total else 0
+            self.stdout.write(
+                f'{name}: hits={stats["hit"]} misses={stats["miss"]} '
+                f'stale={stats["stale"]} hit_rate={rate:.1%}')
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import synthetic
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Добавляет в базу синтетических пользователей, группы, посты, '
+            'комментарии и подписки с неравномерным распределением. '
+            f'Пароль пользователей: {synthetic.PASSWORD}')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=10000, help='число постов')
+        parser.add_argument(
+            '--users', type=int,
+            help='число пользователей, по умолчанию posts / 20')
+        parser.add_argument(
+            '--groups', type=int,
+            help='число групп, по умолчанию posts / 1000')
+        parser.add_argument(
+            '--comments', type=int,
+            help='число комментариев, по умолчанию равно posts')
+        parser.add_argument(
+            '--follows', type=float, default=10,
+            help='среднее число подписок нового пользователя')
+        parser.add_argument(
+            '--batch-size', type=int, default=synthetic.BATCH_SIZE,
+            help='строк в одном INSERT')
+        parser.add_argument('--seed', type=int, help='зерно генератора')
+
+    def step(self, title, create, *args):
+        started = time.monotonic()
+        result = create(*args)
+        count = f'{len(result)} ' if result is not None else ''
+        self.stdout.write(
+            f'{title}: {count}за {time.monotonic() - started:.1f} с')
+        return result
+
+    def handle(self, *args, **options):
+        posts = options['posts']
+        users = options['users']
+        if users is None:
+            users = max(posts // 20, 2)
+        groups = options['groups']
+        if groups is None:
+            groups = max(posts // 1000, 1)
+        comments = options['comments']
+        if comments is None:
+            comments = posts
+        generator = synthetic.Generator(
+            seed=options['seed'], batch_size=options['batch_size'])
+
+        new_users = self.step('Пользователи', generator.users, users)
+        self.step('Группы', generator.groups, groups)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+        new_posts = self.step(
+            'Посты', generator.posts, posts, user_ids, group_ids)
+        if new_posts:
+            self.step('Комментарии', generator.comments,
+                      comments, new_posts, user_ids)
+        if len(user_ids) > 1:
+            self.step('Подписки', generator.follows,
+                      new_users, user_ids, options['follows'])
+        self.step('Ленты, счётчики и индекс поиска', synthetic.finalize)
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы'))
@@ -0,0 +1,50 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import ingest, search
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из NDJSON (в том числе из выгрузки '
+            'export_data) пачками через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='файл NDJSON, .gz или - для stdin')
+        parser.add_argument(
+            '--images', help='каталог, относительно которого ищутся картинки')
+        parser.add_argument(
+            '--batch-size', type=int, default=ingest.BATCH_SIZE)
+
+    def open(self, path):
+        if path == '-':
+            return sys.stdin.buffer
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        importer = ingest.Importer(
+            images_dir=options['images'], batch_size=options['batch_size'],
+            keep_dates=True, schedule_variants=False)
+        source = self.open(options['path'])
+        try:
+            importer.run(source)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+        search.optimize_index()
+        for error in importer.errors:
+            self.stderr.write(f'Строка {error["line"]}: {error["errors"]}')
+        self.stdout.write(
+            f'Создано постов: {importer.created}, '
+            f'пропущено строк: {importer.failed} '
+            f'за {time.perf_counter() - started:.1f} с')
+        if importer.images:
+            self.stdout.write(
+                f'Картинок: {importer.images}; варианты для них создаст '
+                f'manage.py regenerate_image_variants')
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import loadtest
+from posts.models import Group, Post
+
+User = get_user_model()
+
+LOADTEST_USERNAME = 'loadtest-{}'
+SAMPLE_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер yatube сценариями по именованным '
+            'маршрутам и печатает p50/p95/p99 и пропускную способность '
+            'для каждого маршрута')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://127.0.0.1:8000/',
+            help='адрес сервера')
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(loadtest.SCENARIOS),
+            help='сценарий; можно указать несколько раз, по умолчанию все')
+        parser.add_argument(
+            '--concurrency', type=int, default=10,
+            help='число одновременных пользователей')
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='длительность в секундах')
+        parser.add_argument(
+            '--password', default='loadtest-password',
+            help='пароль создаваемых пользователей loadtest-N')
+        parser.add_argument(
+            '--max-p95', type=float,
+            help='завершиться с ошибкой, если p95 маршрута больше, мс')
+        parser.add_argument('--seed', type=int, help='зерно случайных выборов')
+
+    def prepare_users(self, count, password):
+        """Создаёт пользователей loadtest-N с известным паролем."""
+        credentials = []
+        for number in range(count):
+            user, _ = User.objects.get_or_create(
+                username=LOADTEST_USERNAME.format(number))
+            user.set_password(password)
+            user.save(update_fields=['password'])
+            credentials.append((user.username, password))
+        return credentials
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or sorted(loadtest.SCENARIOS)
+        data = {
+            'posts': list(Post.objects.order_by('-pub_date').values_list(
+                'pk', flat=True)[:SAMPLE_SIZE]),
+            'groups': list(Group.objects.values_list(
+                'slug', flat=True)[:SAMPLE_SIZE]),
+            'authors': list(User.objects.filter(
+                posts__isnull=False).distinct().values_list(
+                'username', flat=True)[:SAMPLE_SIZE]),
+        }
+        credentials = ()
+        if loadtest.AUTHENTICATED_SCENARIOS.intersection(scenarios):
+            credentials = self.prepare_users(
+                options['concurrency'], options['password'])
+        recorder = loadtest.run(
+            options['base_url'], scenarios, data,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            credentials=credentials,
+            seed=options['seed'])
+
+        rows = recorder.report()
+        self.stdout.write(
+            f'{"маршрут":<24}{"запросы":>9}{"ошибки":>8}'
+            f'{"p50":>9}{"p95":>9}{"p99":>9}{"rps":>9}')
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:<24}{row["count"]:>9}{row["errors"]:>8}'
+                f'{row["p50"]:>9.1f}{row["p95"]:>9.1f}{row["p99"]:>9.1f}'
+                f'{row["rps"]:>9.1f}')
+        failed_logins = sum(
+            row['errors'] for row in rows if row['name'] == 'users:login')
+        if failed_logins:
+            raise CommandError(
+                f'Не удалось войти на сайт: {failed_logins}; '
+                f'эти потоки остановлены')
+        slow = [
+            row['name'] for row in rows
+            if options['max_p95'] is not None
+            and row['p95'] > options['max_p95']
+        ]
+        if slow:
+            raise CommandError(
+                f'p95 больше {options["max_p95"]} мс: {", ".join(slow)}')
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core import metrics, template_profiler
+
+from .benchmark_views import BENCHMARK_ADDR, _targets
+
+
+class Command(BaseCommand):
+    help = ('Показывает, на какие шаблоны, include и теги уходит время '
+            'отрисовки каждой страницы posts.views')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='сколько раз запрашивать каждую страницу')
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='не очищать кэш перед запросами')
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='сколько самых долгих частей показывать')
+
+    def profile(self, url, user, repeat, warm):
+        """Профиль страницы: часть -> [отрисовок, секунд] за все запросы."""
+        client = Client(REMOTE_ADDR=BENCHMARK_ADDR)
+        if user is not None:
+            client.force_login(user)
+        metrics.registry.reset()
+        for _ in range(repeat):
+            if not warm:
+                cache.clear()
+            client.get(url)
+        parts = {}
+        for total in metrics.registry.views.values():
+            for part, (count, seconds) in total['render'].items():
+                parts.setdefault(part, [0, 0])
+                parts[part][0] += count
+                parts[part][1] += seconds
+        return parts
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        template_profiler.install()
+        try:
+            with override_settings(METRICS_SAMPLE_RATE=1):
+                for name, url, user in _targets():
+                    parts = self.profile(url, user, repeat, options['warm'])
+                    self.stdout.write(self.style.MIGRATE_HEADING(name))
+                    self.stdout.write(
+                        f'  {"часть":<52}{"раз":>7}{"мс":>9}')
+                    for part, (count, seconds) in sorted(
+                            parts.items(), key=lambda item: -item[1][1]
+                    )[:options['top']]:
+                        self.stdout.write(
+                            f'  {part:<52}{count / repeat:>7.1f}'
+                            f'{seconds / repeat * 1000:>9.2f}')
+        finally:
+            template_profiler.uninstall()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики AuthorStats по данным постов и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'authors', nargs='*', type=int,
+            help='id авторов; по умолчанию пересчитываются все')
+
+    def handle(self, *args, **options):
+        stats.rebuild(author_ids=options['authors'] or None)
+        self.stdout.write(self.style.SUCCESS('Счётчики авторов пересчитаны'))
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import Post, PostImageVariant
+
+
+def _generate(post_id):
+    try:
+        thumbnails.generate_variants(post_id)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт варианты картинок постов для srcset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='пересоздать варианты, даже если они уже есть')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='число потоков генерации')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if options['all']:
+            PostImageVariant.objects.all().delete()
+        else:
+            posts = posts.filter(image_variants__isnull=True)
+        post_ids = list(posts.values_list('pk', flat=True))
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            list(pool.map(_generate, post_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f'Варианты картинок созданы для {len(post_ids)} постов'))
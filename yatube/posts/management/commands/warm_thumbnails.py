@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(name):
+    try:
+        thumbnails.generate(name)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Заранее генерирует миниатюры картинок существующих постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='число потоков генерации')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True).distinct()
+        total = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for _ in pool.map(_generate, names.iterator()):
+                total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры подготовлены для {total} картинок'))
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from . import urlbuilder
+
 User = get_user_model()
 
 
@@ -12,6 +14,9 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    def get_absolute_url(self):
+        return urlbuilder.build('posts:group_list', self.slug)
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -40,8 +45,22 @@ class Post(models.Model):
     def __str__(self):
         return self.text
 
+    def get_absolute_url(self):
+        return urlbuilder.build('posts:post_detail', self.pk)
+
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -55,9 +74,17 @@ class Comment(models.Model):
         related_name='comments')
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    # Ключ отправки формы: повтор той же отправки не создаёт дубль
+    idempotency_key = models.UUIDField(
+        null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         ordering = ('created',)
+        indexes = [
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -71,3 +98,83 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок: пост автора, разложенный подписчику.
+
+    Заполняется при публикации поста и при подписке, поэтому
+    страница ленты читается одним диапазоном по индексу
+    (user, pub_date) без соединения Post с Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='feed_user_pub_date_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора для страниц профиля и поста."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats')
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+
+class PostImageVariant(models.Model):
+    """Уменьшенная копия картинки поста в одном размере и формате.
+
+    Файлы лежат в хранилище sorl-thumbnail (media/cache/...) и
+    создаются один раз после загрузки картинки.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants')
+    source = models.CharField('Исходная картинка', max_length=255)
+    name = models.CharField('Файл', max_length=255)
+    format = models.CharField('Формат', max_length=10)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+
+    class Meta:
+        ordering = ('width',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'format', 'width'),
+                name='unique_post_image_variant'),
+        ]
+
+    def __str__(self):
+        return self.name
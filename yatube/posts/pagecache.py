@@ -0,0 +1,96 @@
+"""Полностраничный кэш для гостей с «дырами» под данные пользователя.
+
+Страницы view с декоратором anonymous_page_cache, отрисованные для
+гостя, сохраняются целиком по пути и строке запроса. Вошедшие
+пользователи, ответы с CSRF-токеном или cookie и ответы не 200
+проходят мимо кэша. Ключ содержит версии постов и
+групп, поэтому любая их запись сбрасывает кэш страниц.
+
+Шаблоны из PAGE_CACHE_HOLES, вставленные тегом {% page_hole %},
+в сохранённую страницу не попадают: на их месте остаётся метка,
+и при каждой отдаче страницы они отрисовываются заново для текущего
+запроса — например, шапка с состоянием входа на сайт.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from . import cache
+
+PAGE_KEY = 'posts:page:{}:{}'
+PAGE_SCOPES = ('post', 'group')
+HOLE = '<!--page-hole:{}-->'
+HOLE_PATTERN = re.compile(r'<!--page-hole:([\w./-]+)-->')
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def page_key(request):
+    version = '.'.join(str(v) for v in cache.get_versions(PAGE_SCOPES))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(version, path)
+
+
+def hole(template_name):
+    return HOLE.format(template_name)
+
+
+def fill_holes(content, request):
+    """Отрисовывает шаблоны на месте меток для текущего запроса."""
+    def render(match):
+        name = match.group(1)
+        if name not in settings.PAGE_CACHE_HOLES:
+            return ''
+        return render_to_string(name, request=request)
+    return HOLE_PATTERN.sub(render, content)
+
+
+def _is_guest(request):
+    # Без cookie сессии пользователь точно гость, и сессию
+    # можно не загружать.
+    return (settings.SESSION_COOKIE_NAME not in request.COOKIES
+            or not request.user.is_authenticated)
+
+
+def _storable(request, response):
+    return (response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def anonymous_page_cache(view):
+    """Кэширует страницы view для гостей на PAGE_CACHE_TIMEOUT секунд."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or not _is_guest(request):
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        cached = cache.get_cache().get(key)
+        if cached is not None:
+            cache._count('page', 'hit')
+            content, content_type = cached
+            response = HttpResponse(
+                fill_holes(content, request), content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+            return response
+        cache._count('page', 'miss')
+        request.page_cache_holes = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            request.page_cache_holes = False
+        if response.streaming:
+            return response
+        content = response.content.decode(response.charset)
+        if _storable(request, response):
+            cache.get_cache().set(
+                key, (content, response['Content-Type']),
+                settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        response.content = fill_holes(content, request)
+        return response
+    return wrapper
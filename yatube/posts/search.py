@@ -0,0 +1,118 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite используется внешняя FTS5-таблица posts_post_fts, которую
+триггеры держат в соответствии с posts_post при любой записи, включая
+bulk_create и update(). На PostgreSQL поиск идёт по GIN-индексу
+to_tsvector. Остальные СУБД получают медленный, но рабочий LIKE.
+"""
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+POSTGRES_CONFIG = 'russian'
+
+
+def fts_query(query):
+    """Превращает строку пользователя в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 во вводе
+    не интерпретируются; слова объединяются через AND.
+    """
+    words = query.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+class RankedPosts:
+    """Результаты поиска FTS5 в порядке bm25 для Paginator.
+
+    Подсчёт и выборка страницы выполняются по FTS-индексу, посты
+    страницы затем берутся одним запросом по первичному ключу.
+    Если posts отфильтрован, оба запроса ограничены его ключами,
+    поэтому count() и страницы согласованы между собой.
+    """
+
+    def __init__(self, query, posts):
+        self.match = fts_query(query)
+        self.posts = posts
+
+    def _restriction(self):
+        """Условие на rowid для постов self.posts и его параметры."""
+        if not self.posts.query.has_filters():
+            return '', []
+        sql, params = self.posts.order_by().values(
+            'pk').query.sql_with_params()
+        return f' AND rowid IN ({sql})', list(params)
+
+    def count(self):
+        if not self.match:
+            return 0
+        restriction, params = self._restriction()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s{restriction}',
+                [self.match, *params])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        restriction, params = self._restriction()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s{restriction} '
+                f'ORDER BY bm25({FTS_TABLE}) LIMIT %s OFFSET %s',
+                [self.match, *params, index.stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        found = self.posts.in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+
+def search_posts(query, posts=None):
+    """Посты, подходящие под query, от более релевантных к менее.
+
+    Возвращает объект, который можно передать в Paginator.
+    """
+    if posts is None:
+        posts = Post.objects.all()
+    if connection.vendor == 'sqlite':
+        return RankedPosts(query, posts)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+        vector = SearchVector('text', config=POSTGRES_CONFIG)
+        search_query = SearchQuery(query, config=POSTGRES_CONFIG)
+        return posts.annotate(
+            search=vector, rank=SearchRank(vector, search_query),
+        ).filter(search=search_query).order_by('-rank', '-pk')
+    return posts.filter(text__icontains=query)
+
+
+def matching(queryset, query):
+    """Сужает queryset постов до подходящих под query."""
+    if connection.vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [fts_query(query)]))
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+        return queryset.annotate(
+            search=SearchVector('text', config=POSTGRES_CONFIG),
+        ).filter(search=SearchQuery(query, config=POSTGRES_CONFIG))
+    return queryset.filter(text__icontains=query)
+
+
+def optimize_index():
+    """Сливает сегменты индекса FTS5 после массовой загрузки постов."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
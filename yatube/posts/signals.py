@@ -0,0 +1,82 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import cache, counts, feed, freshness, stats, thumbnails
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Группа до редактирования: её страница тоже меняется
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    cache.bump_version('post')
+    freshness.post_changed(instance, [instance._loaded_group_id])
+    if created or instance._loaded_group_id != instance.group_id:
+        counts.post_changed(
+            instance, [instance._loaded_group_id], created=created)
+    instance._loaded_group_id = instance.group_id
+    if instance.image:
+        thumbnails.schedule_on_commit(
+            thumbnails.generate_variants, instance.pk)
+    if created:
+        feed.fan_out(instance)
+        stats.change(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cache.bump_version('post')
+    freshness.post_changed(instance)
+    counts.post_changed(instance)
+    stats.change(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.bump_version('group')
+    freshness.touch(('group', instance.slug))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    cache.bump_version('comment')
+    freshness.touch(
+        ('post', instance.post_id), ('author', instance.author_id))
+    if created:
+        stats.change(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cache.bump_version('comment')
+    freshness.touch(
+        ('post', instance.post_id), ('author', instance.author_id))
+    stats.change(instance.author_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        freshness.touch(
+            ('author', instance.user_id),
+            ('author', instance.author_id))
+        feed.backfill(instance.user_id, instance.author_id)
+        counts.invalidate(('feed', instance.user_id))
+        stats.change(instance.user_id, following_count=1)
+        stats.change(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    freshness.touch(
+        ('author', instance.user_id),
+        ('author', instance.author_id))
+    feed.drop(instance.user_id, instance.author_id)
+    counts.invalidate(('feed', instance.user_id))
+    stats.change(instance.user_id, following_count=-1)
+    stats.change(instance.author_id, followers_count=-1)
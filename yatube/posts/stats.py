@@ -0,0 +1,76 @@
+"""Поддержка счётчиков AuthorStats в актуальном состоянии."""
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+BATCH_SIZE = 1000
+
+
+def change(author_id, **deltas):
+    """Сдвигает счётчики автора, например change(pk, posts_count=1).
+
+    Если строки ещё нет, она считается с нуля: прибавлять не к чему,
+    а отнимать у удаляемого пользователя не нужно.
+    """
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        rebuild(author_ids=[author_id])
+
+
+def _count(model, field):
+    counts = model.objects.filter(
+        **{field: OuterRef('pk')}).order_by().values(field).annotate(
+            total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def rebuild(author_ids=None):
+    """Пересчитывает счётчики всех или только указанных авторов."""
+    users = User.objects.all()
+    stats = AuthorStats.objects.all()
+    if author_ids is not None:
+        users = users.filter(pk__in=author_ids)
+        stats = stats.filter(author_id__in=author_ids)
+    rows = users.order_by('pk').annotate(
+        posts_total=_count(Post, 'author'),
+        followers_total=_count(Follow, 'author'),
+        following_total=_count(Follow, 'user'),
+        comments_total=_count(Comment, 'author'),
+    ).values_list(
+        'pk', 'posts_total', 'followers_total',
+        'following_total', 'comments_total')
+    # Без транзакции читатели видят пустые счётчики между delete и
+    # вставкой, а сбой посреди пачек оставляет их пустыми навсегда
+    with transaction.atomic():
+        stats.delete()
+        rows = rows.iterator(chunk_size=BATCH_SIZE)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            AuthorStats.objects.bulk_create(
+                AuthorStats(
+                    author_id=pk,
+                    posts_count=posts,
+                    followers_count=followers,
+                    following_count=following,
+                    comments_count=comments)
+                for pk, posts, followers, following, comments in batch)
+
+
+def for_author(author):
+    """Счётчики автора; без строки — несохранённые нулевые.
+
+    Строки нет только у автора без постов, подписок и комментариев:
+    change() создаёт её при первой такой записи. Страницы, которые
+    читают счётчики, сами в базу не пишут.
+    """
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(author=author)
@@ -0,0 +1,175 @@
+"""Генерация больших синтетических наборов данных для замеров.
+
+Объекты создаются через bulk_create пачками, поэтому сигналы не
+срабатывают: ленты, счётчики авторов и индекс поиска доводятся до
+актуального состояния одним проходом в finalize().
+
+Распределения неравномерные, как на живом сайте: подписчики и посты
+авторов и посты групп подчиняются закону Ципфа, а комментарии
+достаются в основном популярным постам.
+"""
+import datetime as dt
+import random
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from faker import Faker
+
+from . import cache, feed, search, stats
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 5000
+# Показатель закона Ципфа: чем больше, тем сильнее перекос
+ZIPF_EXPONENT = 1.1
+# Доля постов вне групп
+UNGROUPED_SHARE = 0.3
+# За сколько дней до текущего момента распределены даты
+DATE_SPAN_DAYS = 365
+TEXT_POOL_SIZE = 1000
+USERNAME = 'synthetic{}'
+GROUP_SLUG = 'synthetic-{}'
+PASSWORD = 'synthetic-password'
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса рангов 1..count по закону Ципфа."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+def last_pk(model):
+    """Наибольший первичный ключ model или 0 для пустой таблицы."""
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+
+
+def _new_pks(model, after):
+    return list(model.objects.filter(pk__gt=after).order_by(
+        'pk').values_list('pk', flat=True))
+
+
+def bulk_create(model, objects, batch_size=BATCH_SIZE, dates=None,
+                **kwargs):
+    """Вставляет objects пачками и возвращает первичные ключи новых строк.
+
+    SQLite не сообщает ключи из bulk_create, поэтому новые строки
+    выбираются по ключу больше прежнего максимума. dates — имя поля
+    с auto_now_add, значения которого в objects нужно сохранить:
+    при вставке оно получает текущий момент, поэтому после каждой
+    пачки даты проставляются заново через bulk_update.
+    """
+    first = last_pk(model)
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            break
+        values = [getattr(obj, dates) for obj in batch] if dates else None
+        before = last_pk(model) if dates else None
+        model.objects.bulk_create(batch, **kwargs)
+        if dates:
+            model.objects.bulk_update(
+                [model(pk=pk, **{dates: value}) for pk, value in zip(
+                    _new_pks(model, before), values)],
+                [dates], batch_size=batch_size)
+    return _new_pks(model, first)
+
+
+class Generator:
+    """Добавляет в базу синтетических пользователей, посты и связи."""
+
+    def __init__(self, seed=None, batch_size=BATCH_SIZE):
+        self.rng = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.batch_size = batch_size
+        self.now = timezone.now()
+        self.texts = [
+            self.faker.sentence(nb_words=12) for _ in range(TEXT_POOL_SIZE)]
+
+    def text(self):
+        return ' '.join(self.rng.choices(self.texts, k=self.rng.randint(1, 6)))
+
+    def date(self, after=None):
+        start = after or self.now - dt.timedelta(days=DATE_SPAN_DAYS)
+        return start + (self.now - start) * self.rng.random()
+
+    def skewed(self, values):
+        """Функция выбора k значений с перекосом в пользу немногих."""
+        values = list(values)
+        self.rng.shuffle(values)
+        weights = zipf_weights(len(values))
+        return lambda k: self.rng.choices(values, cum_weights=weights, k=k)
+
+    def users(self, count):
+        # Номер в имени меньше ключа пользователя, поэтому отсчёт от
+        # наибольшего ключа не совпадает с именами уже созданных
+        start = last_pk(User)
+        password = make_password(PASSWORD)
+        return bulk_create(User, (
+            User(username=USERNAME.format(start + number),
+                 first_name=self.faker.first_name(),
+                 last_name=self.faker.last_name(),
+                 password=password)
+            for number in range(count)), self.batch_size)
+
+    def groups(self, count):
+        start = last_pk(Group)
+        return bulk_create(Group, (
+            Group(title=self.faker.catch_phrase()[:200],
+                  slug=GROUP_SLUG.format(start + number),
+                  description=self.faker.paragraph())
+            for number in range(count)), self.batch_size)
+
+    def posts(self, count, author_ids, group_ids):
+        pick_author = self.skewed(author_ids)
+        pick_group = self.skewed(group_ids) if group_ids else None
+
+        def build():
+            for author_id in pick_author(count):
+                group_id = None
+                if pick_group and self.rng.random() > UNGROUPED_SHARE:
+                    group_id = pick_group(1)[0]
+                yield Post(text=self.text(), author_id=author_id,
+                           group_id=group_id, pub_date=self.date())
+
+        return bulk_create(Post, build(), self.batch_size, dates='pub_date')
+
+    def comments(self, count, post_ids, author_ids):
+        dates = dict(Post.objects.filter(
+            pk__in=post_ids).values_list('pk', 'pub_date').iterator())
+        pick_post = self.skewed(post_ids)
+
+        def build():
+            for post_id in pick_post(count):
+                yield Comment(
+                    post_id=post_id, author_id=self.rng.choice(author_ids),
+                    text=self.faker.sentence(), created=self.date(
+                        after=dates[post_id]))
+
+        return bulk_create(
+            Comment, build(), self.batch_size, dates='created')
+
+    def follows(self, user_ids, author_ids, mean):
+        """Подписывает каждого из user_ids в среднем на mean авторов."""
+        pick_author = self.skewed(author_ids)
+
+        def build():
+            for user_id in user_ids:
+                count = min(round(self.rng.expovariate(1 / mean)),
+                            len(author_ids) - 1)
+                for author_id in set(pick_author(count)) - {user_id}:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        return bulk_create(Follow, build(), self.batch_size,
+                           ignore_conflicts=True)
+
+
+def finalize():
+    """Доводит производные данные до состояния после обычных записей."""
+    feed.rebuild()
+    stats.rebuild()
+    search.optimize_index()
+    for scope in ('post', 'group', 'comment', 'count'):
+        cache.bump_version(scope)
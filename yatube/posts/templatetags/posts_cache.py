@@ -0,0 +1,61 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cache, pagecache
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, timeout, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.timeout = timeout
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return cache.get_or_compute(
+            self.name,
+            cache.fragment_key(self.name, vary_on),
+            lambda: self.nodelist.render(context),
+            timeout)
+
+
+@register.tag
+def fragment_cache(parser, token):
+    """Кэширует фрагмент до таймаута или до изменения данных.
+
+        {% fragment_cache 'index' 20 request.GET.urlencode %}
+            ...
+        {% endfragment_cache %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 2 arguments.")
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    name = bits[1].strip('\'"')
+    return FragmentCacheNode(
+        nodelist,
+        name,
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
+
+
+@register.simple_tag(takes_context=True)
+def page_hole(context, template_name):
+    """Вставляет шаблон, который не сохраняется в кэше страницы.
+
+        {% page_hole 'includes/header.html' %}
+
+    При сохранении страницы на месте шаблона остаётся метка, и он
+    отрисовывается заново для каждого запроса.
+    """
+    request = context.get('request')
+    if getattr(request, 'page_cache_holes', False):
+        return mark_safe(pagecache.hole(template_name))
+    return context.template.engine.get_template(template_name).render(context)
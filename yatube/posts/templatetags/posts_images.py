@@ -0,0 +1,63 @@
+from django import template
+from sorl.thumbnail import default
+
+from posts import thumbnails
+
+register = template.Library()
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+FALLBACK_FORMAT = 'JPEG'
+SIZES = (
+    f'(max-width: {thumbnails.THUMBNAIL_WIDTH}px) 100vw, '
+    f'{thumbnails.THUMBNAIL_WIDTH}px')
+
+
+@register.simple_tag
+def post_thumbnail(image):
+    """Готовая миниатюра картинки поста или None, пока она генерируется.
+
+        {% post_thumbnail post.image as im %}
+    """
+    return thumbnails.ready_thumbnail(image)
+
+
+def _srcset(variants):
+    return ', '.join(
+        f'{default.storage.url(variant.name)} {variant.width}w'
+        for variant in variants)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """Картинка поста с srcset по готовым вариантам.
+
+    Варианты стоит заранее выбрать prefetch_related('image_variants').
+    Пока вариантов нет, выводится обычная миниатюра или заглушка.
+    """
+    by_format = {}
+    if post.image:
+        for variant in post.image_variants.all():
+            if variant.source == post.image.name:
+                by_format.setdefault(variant.format, []).append(variant)
+    fallback = by_format.pop(FALLBACK_FORMAT, None)
+    if not fallback:
+        return {'post': post, 'fallback': None}
+    default_variant = next(
+        (variant for variant in fallback
+         if variant.width == thumbnails.THUMBNAIL_WIDTH), fallback[-1])
+    return {
+        'post': post,
+        'sizes': SIZES,
+        'sources': [
+            (mime_type, _srcset(by_format[image_format]))
+            for image_format, mime_type in MIME_TYPES.items()
+            if image_format in by_format
+        ],
+        'fallback': default_variant,
+        'fallback_url': default.storage.url(default_variant.name),
+        'fallback_srcset': _srcset(fallback),
+    }
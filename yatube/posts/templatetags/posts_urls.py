@@ -0,0 +1,11 @@
+from django import template
+
+from posts import urlbuilder
+
+register = template.Library()
+
+
+@register.simple_tag
+def fast_url(name, *args):
+    """Как {% url name arg ... %}, но без перебора маршрутов reverse()."""
+    return urlbuilder.build(name, *args)
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from django.test import TestCase
+
+from posts import cache
+from posts.models import Group
+
+COUNT_WORKERS = 5
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.1)
+        return 'fragment'
+
+    def test_only_one_worker_recomputes(self):
+        """Одновременный промах пересчитывает фрагмент один раз."""
+        results = []
+        workers = [
+            threading.Thread(target=lambda: results.append(
+                cache.get_or_compute('test', 'key', self.compute, 20)))
+            for _ in range(COUNT_WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['fragment'] * COUNT_WORKERS)
+
+    def test_stale_copy_served_while_locked(self):
+        """Пока идёт пересчёт, отдаётся устаревшая копия."""
+        default_cache.set('key', (time.time() - 1, 'old'))
+        default_cache.add(cache.LOCK_KEY.format('key'), 1)
+        self.assertEqual(
+            cache.get_or_compute('test', 'key', self.compute, 20), 'old')
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(cache.fragment_stats('test')['stale'], 1)
+
+    def test_model_writes_bump_versions(self):
+        versions = cache.get_versions(['post', 'group'])
+        Group.objects.create(title='Группа', slug='slug', description='')
+        self.assertEqual(
+            cache.get_versions(['post', 'group']),
+            [versions[0], versions[1] + 1])
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import cache as posts_cache
+from posts import commentqueue
+from posts.models import AuthorStats, Comment, Post
+
+User = get_user_model()
+
+SPOOL_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND=True, COMMENT_SPOOL_DIR=SPOOL_DIR,
+    COMMENT_FLUSH_INTERVAL=0)
+class CommentQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SPOOL_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(SPOOL_DIR, ignore_errors=True)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.detail = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def comment(self, text, key=None):
+        return self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': text, 'idempotency_key': key or uuid.uuid4()})
+
+    def test_author_sees_queued_comment(self):
+        self.comment('В очереди')
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.client.get(self.detail), 'В очереди')
+        other = Client()
+        other.force_login(self.author)
+        self.assertNotContains(other.get(self.detail), 'В очереди')
+        self.assertEqual(commentqueue.flush_all(), 1)
+        comment = Comment.objects.get()
+        self.assertEqual(
+            (comment.text, comment.author), ('В очереди', self.reader))
+        self.assertContains(other.get(self.detail), 'В очереди')
+        self.assertContains(
+            self.client.get(self.detail), 'В очереди', count=1)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.reader).comments_count, 1)
+
+    def test_cache_reset_after_commit(self):
+        """Кэш сбрасывается только после фиксации вставки."""
+        self.comment('После фиксации')
+        version = posts_cache.get_version('comment')
+        commentqueue.flush_all()
+        self.assertEqual(posts_cache.get_version('comment'), version)
+        for _, callback in connection.run_on_commit:
+            callback()
+        self.assertNotEqual(posts_cache.get_version('comment'), version)
+
+    def test_retry_does_not_duplicate(self):
+        key = uuid.uuid4()
+        self.comment('Повтор', key)
+        self.comment('Повтор', key)
+        commentqueue.flush_all()
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_flush_after_crash_is_idempotent(self):
+        """Файл, вставленный, но не удалённый до сбоя, не даёт дубля."""
+        self.comment('Один раз')
+        name = os.listdir(SPOOL_DIR)[0]
+        with open(os.path.join(SPOOL_DIR, name), 'rb') as file:
+            content = file.read()
+        commentqueue.flush_all()
+        with open(os.path.join(SPOOL_DIR, name), 'wb') as file:
+            file.write(content)
+        commentqueue.flush_all()
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(os.listdir(SPOOL_DIR), [])
+
+    def test_batches_and_orphans(self):
+        for number in range(5):
+            self.comment(f'Комментарий {number}')
+        other = Post.objects.create(author=self.author, text='Удалённый')
+        commentqueue.enqueue(other, self.reader, 'Сирота', uuid.uuid4())
+        other.delete()
+        self.assertEqual(commentqueue.flush(batch_size=2), 2)
+        self.assertEqual(commentqueue.flush_all(), 4)
+        self.assertEqual(Comment.objects.count(), 5)
+
+    @override_settings(COMMENT_WRITE_BEHIND=False)
+    def test_sync_retry_does_not_duplicate(self):
+        key = uuid.uuid4()
+        self.comment('Сразу', key)
+        self.comment('Сразу', key)
+        self.assertEqual(Comment.objects.filter(text='Сразу').count(), 1)
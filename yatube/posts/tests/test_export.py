@@ -0,0 +1,101 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+COUNT_POSTS = 7
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='export', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост, "{number}"',
+                group=cls.group if number % 2 else None)
+            for number in range(COUNT_POSTS)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий')
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export_data', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_ndjson_resumes_after_id(self):
+        lines = self.export('posts').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record['id'] for record in records],
+            [post.pk for post in self.posts])
+        self.assertEqual(records[1]['group__slug'], 'export')
+        self.assertEqual(records[0]['author__username'], 'author')
+        rest = self.export('posts', after=records[2]['id']).splitlines()
+        self.assertEqual(rest, lines[3:])
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO(self.export(
+            'comments', format='csv'))))
+        self.assertEqual(rows[0], list(export.EXPORTS['comments'][1]))
+        self.assertEqual(rows[1][-1], 'Комментарий')
+        self.assertEqual(len(rows), 2)
+
+    def test_gzip_to_file(self):
+        handle, path = tempfile.mkstemp(suffix='.csv.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.export('posts', format='csv', gzip=True, output=path)
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(len(rows), COUNT_POSTS + 1)
+        self.assertEqual(rows[1][4], 'Пост, "0"')
+
+    def test_reads_in_chunks(self):
+        """Строки выбираются порциями, а не одним списком."""
+        records = export.rows(
+            Post.objects.all(), ('id',), chunk_size=2)
+        self.assertEqual(next(records)['id'], self.posts[0].pk)
+        self.assertEqual(len(list(records)), COUNT_POSTS - 1)
+
+    def admin_export(self, action):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        return client.post(reverse('admin:posts_post_changelist'), {
+            'action': action,
+            '_selected_action': [post.pk for post in self.posts[:3]],
+        })
+
+    def test_admin_action_streams(self):
+        response = self.admin_export('export_ndjson_gzip')
+        self.assertTrue(response.streaming)
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(
+            [json.loads(line)['id'] for line in body.splitlines()],
+            [post.pk for post in self.posts[:3]])
+
+    def test_admin_action_plain(self):
+        response = self.admin_export('export_csv')
+        self.assertIn('posts.csv"', response['Content-Disposition'])
+        body = ''.join(
+            chunk.decode() for chunk in response.streaming_content)
+        self.assertEqual(
+            [row['id'] for row in csv.DictReader(StringIO(body))],
+            [str(post.pk) for post in self.posts[:3]])
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import ingest
+from posts.models import AuthorStats, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='import', description='Описание')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        with open(os.path.join(self.source, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+
+    def run_import(self, records, **options):
+        path = os.path.join(self.source, 'posts.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(
+                    record if isinstance(record, str)
+                    else json.dumps(record, ensure_ascii=False))
+                file.write('\n')
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_posts', path, images=self.source, stdout=out, stderr=err,
+            **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_in_batches(self):
+        records = [
+            {'author': 'author', 'text': f'Пост {number}', 'group': 'import',
+             'pub_date': f'2020-01-0{number + 1}T12:00:00+00:00'}
+            for number in range(5)]
+        records.append({'author': 'author', 'text': 'С картинкой',
+                        'image': 'small.gif'})
+        out, _ = self.run_import(records, batch_size=2)
+        self.assertEqual(Post.objects.count(), 6)
+        first = Post.objects.get(text='Пост 0')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertTrue(Post.objects.get(text='С картинкой').image)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 6)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 6)
+        self.assertIn('Картинок: 1', out)
+
+    def test_image_files_closed(self):
+        """Файлы картинок закрыты и у принятых, и у отклонённых строк."""
+        importer = ingest.Importer(images_dir=self.source, batch_size=2)
+        opened = []
+        image = importer.image
+
+        def track(name):
+            opened.append(image(name))
+            return opened[-1]
+
+        importer.image = track
+        importer.run(json.dumps(record) for record in (
+            {'author': 'author', 'text': 'Принят', 'image': 'small.gif'},
+            {'author': 'author', 'text': '', 'image': 'small.gif'},
+            {'author': 'nobody', 'text': 'Текст', 'image': 'small.gif'},
+        ))
+        self.assertEqual(importer.created, 1)
+        self.assertEqual(len(opened), 3)
+        self.assertTrue(all(file.closed for file in opened))
+
+    def test_invalid_lines_reported(self):
+        out, err = self.run_import([
+            {'author': 'author', 'text': ''},
+            {'author': 'nobody', 'text': 'Текст'},
+            {'author': 'author', 'text': 'Текст', 'group': 'missing'},
+            {'author': 'author', 'text': 'Текст', 'image': 'absent.gif'},
+            'не json',
+            {'author': 'author', 'text': 'Годный'},
+        ])
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Годный'])
+        self.assertIn('пропущено строк: 5', out)
+        for line in range(1, 6):
+            self.assertIn(f'Строка {line}:', err)
+
+    def test_non_string_values_reported(self):
+        """Списки и числа вместо строк не роняют импорт."""
+        out, err = self.run_import([
+            {'author': 'author', 'text': 'Текст', 'group': [1]},
+            {'author': 'author', 'text': 'Текст', 'image': ['a']},
+            {'author': ['author'], 'text': 'Текст'},
+            {'author': 'author', 'text': 'Текст', 'pub_date': 2020},
+            {'author': 'author', 'text': 'Годный'},
+        ])
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Годный'])
+        self.assertIn('пропущено строк: 4', out)
+        for line in range(1, 5):
+            self.assertIn(f'Строка {line}:', err)
+
+    def test_export_round_trip(self):
+        Post.objects.create(
+            author=self.author, text='Из выгрузки', group=self.group)
+        exported = StringIO()
+        call_command('export_data', 'posts', stdout=exported)
+        Post.objects.all().delete()
+        self.run_import(exported.getvalue().splitlines())
+        post = Post.objects.get()
+        self.assertEqual(
+            (post.text, post.group, post.author),
+            ('Из выгрузки', self.group, self.author))
@@ -0,0 +1,66 @@
+import random
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from posts import loadtest
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        timings = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(timings, 0.50), 50)
+        self.assertEqual(loadtest.percentile(timings, 0.95), 95)
+        self.assertEqual(loadtest.percentile(timings, 0.99), 99)
+        self.assertEqual(loadtest.percentile([], 0.99), 0)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(
+            title='Группа', slug='loadtest', description='Описание')
+        Post.objects.create(author=author, text='Пост', group=group)
+
+    def run_scenario(self, scenario):
+        out = StringIO()
+        call_command(
+            'loadtest', base_url=self.live_server_url, scenario=[scenario],
+            concurrency=1, duration=1, seed=1, stdout=out)
+        return out.getvalue()
+
+    def test_report_per_route(self):
+        """Отчёт содержит строку для каждого маршрута сценария."""
+        report = self.run_scenario('browse')
+        for name in ('posts:index', 'posts:group_list', 'posts:profile',
+                     'posts:post_detail'):
+            self.assertIn(name, report)
+
+    def test_authenticated_scenario(self):
+        """Сценарий с комментарием входит на сайт и пишет комментарий."""
+        report = self.run_scenario('comment')
+        self.assertIn('users:login', report)
+        self.assertIn('posts:add_comment', report)
+        self.assertTrue(Comment.objects.filter(
+            text=loadtest.COMMENT_TEXT).exists())
+
+    def test_failed_login_stops_worker(self):
+        """Поток без входа не считает переадресации на вход ответами."""
+        recorder = loadtest.run(
+            self.live_server_url, ['feed'], {}, concurrency=1, duration=1,
+            credentials=[('nobody', 'wrong-password')])
+        rows = {row['name']: row for row in recorder.report()}
+        self.assertEqual(rows['users:login']['errors'], 1)
+        self.assertNotIn('posts:follow_index', rows)
+
+    def test_unexpected_redirect_is_error(self):
+        recorder = loadtest.Recorder()
+        user = loadtest.VirtualUser(
+            self.live_server_url, recorder, {}, random.Random(1))
+        user.get('posts:follow_index')
+        self.assertEqual(recorder.report()[0]['errors'], 1)
@@ -1,7 +1,12 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Group, Post
+from posts import stats
+from posts.models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -43,3 +48,58 @@ class PostModelTest(TestCase):
         post = self.post
         expected_object_name = post.text
         self.assertEqual(expected_object_name, post.__str__())
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def assertStats(self, user, **expected):
+        user_stats = AuthorStats.objects.get(author=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(user_stats, field), value)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Ещё пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertStats(self.author, posts_count=2, followers_count=1)
+        self.assertStats(self.reader, following_count=1, comments_count=1)
+        post.delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertStats(self.author, posts_count=1, followers_count=0)
+        self.assertStats(self.reader, following_count=0, comments_count=0)
+
+    def test_rebuild(self):
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.all().delete()
+        stats.rebuild()
+        self.assertStats(self.author, posts_count=1, comments_count=0)
+        self.assertStats(self.reader, posts_count=0)
+
+    def test_failed_rebuild_keeps_old_counters(self):
+        """Сбой при вставке не оставляет авторов без счётчиков"""
+        Post.objects.create(author=self.author, text='Пост')
+        with mock.patch.object(
+                AuthorStats.objects, 'bulk_create',
+                side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                stats.rebuild()
+        self.assertStats(self.author, posts_count=1)
+
+    def test_missing_stats_read_without_writes(self):
+        """Счётчики нового автора читаются без записи в базу"""
+        newcomer = User.objects.create_user(username='newcomer')
+        with CaptureQueriesContext(connection) as queries:
+            newcomer_stats = stats.for_author(newcomer)
+        self.assertEqual(newcomer_stats.posts_count, 0)
+        self.assertFalse(AuthorStats.objects.filter(author=newcomer).exists())
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if not query['sql'].startswith('SELECT')])
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+COUNT_AUTHORS = 5
+
+
+@override_settings(QUERY_INSPECTION='raise')
+class NPlusOneTests(TestCase):
+    """Страницы posts.views не повторяют запросы для каждого объекта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='nplusone', description='Описание')
+        for number in range(COUNT_AUTHORS):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=cls.reader, author=author)
+            other_group = Group.objects.create(
+                title=f'Группа {number}', slug=f'group{number}',
+                description='Описание')
+            cls.post = Post.objects.create(
+                author=author, text='Текст', group=cls.group)
+            Post.objects.create(
+                author=author, text='Текст', group=other_group)
+        for number in range(COUNT_AUTHORS):
+            commentator = User.objects.create_user(
+                username=f'commentator{number}')
+            Comment.objects.create(
+                post=cls.post, author=commentator, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_pages(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=1',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.post.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Текст',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import freshness
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+COUNT_POSTS = 15
+COUNT_COMMENTS = 5
+
+
+class ViewQueryCountTests(TestCase):
+    """Число SQL-запросов каждой страницы не зависит от объёма данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='queries', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(COUNT_POSTS):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group)
+        for i in range(COUNT_COMMENTS):
+            commentator = User.objects.create_user(username=f'user{i}')
+            Comment.objects.create(
+                post=cls.post, author=commentator, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        # Моменты изменений страниц уже в кэше, как после любой записи
+        freshness.touch(
+            ('group', self.group.slug), ('author', self.author.pk),
+            ('post', self.post.pk))
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_guest_pages(self):
+        pages = (
+            (reverse('posts:index'), 2),
+            (reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+             3),
+            (reverse('posts:profile', kwargs={'username': 'author'}), 4),
+            (reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+             4),
+        )
+        for url, expected in pages:
+            with self.subTest(url=url), self.assertNumQueries(expected):
+                self.client.get(url)
+
+    def test_authorized_pages(self):
+        pages = (
+            (reverse('posts:index'), 4),
+            (reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+             5),
+            (reverse('posts:profile', kwargs={'username': 'author'}), 7),
+            (reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+             6),
+            (reverse('posts:follow_index'), 4),
+        )
+        for url, expected in pages:
+            with self.subTest(url=url), self.assertNumQueries(expected):
+                self.reader_client.get(url)
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from posts import search, synthetic
+from posts.models import (AuthorStats, Comment, FeedEntry, Follow, Group,
+                          Post, User)
+
+
+class GenerateDataTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data', posts=300, users=30, groups=5, comments=200,
+            follows=5, batch_size=64, seed=1, stdout=StringIO())
+
+    def test_counts(self):
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_authors_skewed(self):
+        """Самый плодовитый автор пишет заметно больше среднего."""
+        top = Post.objects.values('author').annotate(
+            total=Count('pk')).order_by('-total').first()
+        self.assertGreater(top['total'], 300 / 30 * 3)
+
+    def test_dates_preserved(self):
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater(len(set(date.date() for date in dates)), 30)
+
+    def test_comment_dates_preserved(self):
+        dates = Comment.objects.values_list('created', flat=True)
+        self.assertGreater(len(set(date.date() for date in dates)), 30)
+
+    def test_names_unique_after_deletion(self):
+        """Новые имена не совпадают со старыми после удалений."""
+        User.objects.order_by('pk').first().delete()
+        Group.objects.order_by('pk').first().delete()
+        generator = synthetic.Generator(seed=2)
+        self.assertEqual(len(generator.users(3)), 3)
+        self.assertEqual(len(generator.groups(3)), 3)
+
+    def test_derived_data_consistent(self):
+        """Ленты, счётчики и поиск соответствуют вставленным строкам."""
+        expected = Follow.objects.filter(
+            author__posts__isnull=False).values_list(
+            'user', 'author__posts').count()
+        self.assertEqual(FeedEntry.objects.count(), expected)
+        author = Post.objects.first().author
+        self.assertEqual(
+            AuthorStats.objects.get(author=author).posts_count,
+            author.posts.count())
+        word = Post.objects.first().text.split()[0]
+        self.assertGreater(search.search_posts(word).count(), 0)
+
+    def test_benchmark_views(self):
+        out = StringIO()
+        call_command('benchmark_views', repeat=2, stdout=out)
+        for name in ('index', 'group_list', 'profile', 'post_detail',
+                     'follow_index', 'search'):
+            self.assertIn(name, out.getvalue())
@@ -0,0 +1,58 @@
+from django.template import Context, Template
+from django.test import SimpleTestCase
+from django.urls import (NoReverseMatch, get_script_prefix, reverse,
+                         set_script_prefix)
+
+from posts import urlbuilder
+from posts.models import Group, Post
+
+ROUTES = (
+    ('posts:index', ()),
+    ('posts:search', ()),
+    ('posts:profile', ('leo',)),
+    ('posts:profile', ('Лев Толстой',)),
+    ('posts:profile', ('a+b@c.d-e_f',)),
+    ('posts:profile_follow', ('100%{x}',)),
+    ('posts:post_detail', (42,)),
+    ('posts:post_edit', ('42',)),
+    ('posts:add_comment', (7,)),
+    ('posts:group_list', ('cats-2',)),
+)
+
+
+class UrlBuilderTests(SimpleTestCase):
+    def test_same_as_reverse(self):
+        for name, args in ROUTES:
+            with self.subTest(name=name, args=args):
+                self.assertEqual(
+                    urlbuilder.build(name, *args), reverse(name, args=args))
+
+    def test_script_prefix(self):
+        prefix = get_script_prefix()
+        self.addCleanup(set_script_prefix, prefix)
+        urlbuilder.build('posts:post_detail', 1)
+        set_script_prefix('/yatube/')
+        self.assertEqual(
+            urlbuilder.build('posts:post_detail', 1), '/yatube/posts/1/')
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(NoReverseMatch):
+            urlbuilder.build('posts:post_detail')
+        with self.assertRaises(NoReverseMatch):
+            urlbuilder.build('posts:missing')
+
+    def test_absolute_urls(self):
+        self.assertEqual(
+            Post(pk=5).get_absolute_url(),
+            reverse('posts:post_detail', args=(5,)))
+        self.assertEqual(
+            Group(slug='cats').get_absolute_url(),
+            reverse('posts:group_list', args=('cats',)))
+
+    def test_template_tag(self):
+        rendered = Template(
+            "{% load posts_urls %}{% fast_url 'posts:profile' name %}"
+        ).render(Context({'name': 'a&b'}))
+        self.assertEqual(
+            rendered, reverse('posts:profile', args=('a&b',)).replace(
+                '&', '&amp;'))
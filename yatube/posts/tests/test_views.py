@@ -1,17 +1,26 @@
 import shutil
 import tempfile
+from unittest import skipUnless
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
+from django.db import IntegrityError, connection, transaction
 from django.db.models.query import QuerySet
-from django.test import Client, TestCase, override_settings
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post
+from posts import cache as posts_cache
+from posts import feed, freshness, pagecache, thumbnails
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+from posts.search import search_posts
+from posts.utils import WindowedPaginator
 
 User = get_user_model()
 
@@ -20,6 +29,14 @@ COUNT_POSTS_ON_PAGE = 10
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostsPagesTests(TestCase):
@@ -33,16 +50,9 @@ class PostsPagesTests(TestCase):
             description='test_description',
             slug='test_slug'
         )
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x01\x00'
-            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
-            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
-            b'\x00\x00\x01\x00\x01\x00\x00\x02'
-            b'\x02\x4c\x01\x00\x3b'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='image/gif')
         cls.post = Post.objects.create(
             text='Тестовый текст',
@@ -140,10 +150,7 @@ class PostsPagesTests(TestCase):
         """Проверка хранения и очищения кэша для index."""
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='new_post',
-            author=self.user,
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='changed')
         response_old = self.authorized_client.get(reverse('posts:index'))
         old_posts = response_old.content
         self.assertEqual(old_posts, posts)
@@ -152,6 +159,44 @@ class PostsPagesTests(TestCase):
         new_posts = response_new.content
         self.assertNotEqual(old_posts, new_posts)
 
+    def test_cache_index_invalidated_by_new_post(self):
+        """Новый пост сразу сбрасывает кэш index."""
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.create(text='new_post', author=self.user)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'new_post')
+
+    def test_cache_varies_on_page(self):
+        """Разные страницы index не отдают один и тот же фрагмент."""
+        for i in range(COUNT_POSTS_ON_PAGE):
+            Post.objects.create(text=f'post {i}', author=self.user)
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.authorized_client.get(
+            reverse('posts:index'),
+            {'cursor': first.context['page_obj'].next_cursor})
+        self.assertContains(second, self.post.text)
+        self.assertNotContains(first, self.post.text)
+
+    def test_cache_stats(self):
+        """Попадания и промахи кэша фрагментов учитываются."""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(
+            posts_cache.fragment_stats('index'),
+            {'hit': 1, 'miss': 1, 'stale': 0})
+
+    def test_cache_hit_skips_posts_query(self):
+        """Фрагмент index из кэша не читает посты из базы."""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']])
+
 
 class TestPaginatorPages(TestCase):
     @classmethod
@@ -174,6 +219,8 @@ class TestPaginatorPages(TestCase):
         cls.post = Post.objects.bulk_create(cls.post_list)
 
     def setUp(self):
+        # Посты созданы bulk_create в обход сигналов, сбрасывающих счётчики
+        cache.clear()
         self.auth_author = Client()
         self.auth_author.force_login(self.author)
 
@@ -208,6 +255,62 @@ class TestPaginatorPages(TestCase):
                 self.assertEqual(len(context_for_first), COUNT_POSTS_ON_PAGE)
                 self.assertEqual(context_for_second, post_for_second)
 
+    def test_cursor_pages_cover_all_posts(self):
+        """Курсорная паджинация проходит все посты без пропусков."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first = self.auth_author.get(url).context['page_obj']
+        self.assertIsNone(first.previous_cursor)
+        self.assertIsNotNone(first.next_cursor)
+        second = self.auth_author.get(
+            url, {'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(
+            len(second), COUNT_NEW_POSTS - COUNT_POSTS_ON_PAGE)
+        self.assertIsNone(second.next_cursor)
+        seen = {post.pk for post in first} | {post.pk for post in second}
+        self.assertEqual(seen, {post.pk for post in Post.objects.all()})
+        back = self.auth_author.get(
+            url, {'cursor': second.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_cursor_page_skips_count(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        first = self.auth_author.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.auth_author.get(
+                reverse('posts:index'),
+                {'cursor': first.context['page_obj'].next_cursor})
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+
+    def test_page_count_cached_until_write(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.auth_author.get(url, {'page': 2})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.auth_author.get(url, {'page': 2})
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         COUNT_NEW_POSTS)
+        Post.objects.create(author=self.author, text='Ещё', group=self.group)
+        response = self.auth_author.get(url, {'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         COUNT_NEW_POSTS + 1)
+
+    def test_page_window(self):
+        paginator = WindowedPaginator(range(1000), COUNT_POSTS_ON_PAGE)
+        self.assertEqual(
+            paginator.window(50), [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(paginator.window(4), [1, 2, 3, 4, 5, 6, None, 100])
+        self.assertEqual(
+            WindowedPaginator(range(30), COUNT_POSTS_ON_PAGE).window(1),
+            [1, 2, 3])
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.auth_author.get(
+            reverse('posts:index'), {'cursor': 'broken!'})
+        self.assertEqual(
+            len(response.context['page_obj']), COUNT_POSTS_ON_PAGE)
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -270,3 +373,346 @@ class FollowTests(TestCase):
         )
         response = test_client.get(reverse('posts:follow_index'))
         self.assertNotContains(response, 'Тестовый текст')
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора раскладывается в ленты подписчиков."""
+        Follow.objects.create(user=self.follower, author=self.following)
+        post = Post.objects.create(author=self.following, text='Новый пост')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=post).exists())
+        self.assertFalse(FeedEntry.objects.filter(user=self.anonym).exists())
+
+    def test_unfollow_clears_feed(self):
+        """После отписки посты автора пропадают из ленты."""
+        Follow.objects.create(user=self.follower, author=self.following)
+        Follow.objects.filter(
+            user=self.follower, author=self.following).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower).exists())
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_rebuild_feed(self):
+        Follow.objects.create(user=self.follower, author=self.following)
+        FeedEntry.objects.all().delete()
+        feed.rebuild()
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(self.follower.pk, self.post.pk)])
+
+
+class QueryPlanTests(TestCase):
+    """Запросы списков постов используют составные индексы."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='plan', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Текст', group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def query_plan(self, url, table):
+        """План запроса, которым view выбирает строки из table."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        sql = next(
+            query['sql'] for query in queries
+            if f'FROM "{table}"' in query['sql']
+            and 'ORDER BY' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def test_list_views_use_indexes(self):
+        cases = (
+            (reverse('posts:index'), 'posts_post', 'post_pub_date_idx'),
+            (reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+             'posts_post', 'post_group_pub_date_idx'),
+            (reverse('posts:profile', kwargs={'username': 'author'}),
+             'posts_post', 'post_author_pub_date_idx'),
+            (reverse('posts:follow_index'),
+             'posts_feedentry', 'feed_user_pub_date_idx'),
+            (reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+             'posts_comment', 'comment_post_created_idx'),
+        )
+        for url, table, index in cases:
+            with self.subTest(url=url):
+                self.assertIn(index, self.query_plan(url, table))
+
+    def test_follow_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_self_follow_is_rejected(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.author, author=self.author)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='painter')
+        cls.post = Post.objects.create(
+            text='Картинка',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Страница не генерирует миниатюру, а показывает заглушку."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(url), 'placeholder.svg')
+        thumbnails.generate(self.post.image.name)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'placeholder.svg')
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    def test_image_variants_in_srcset(self):
+        """Варианты картинки создаются один раз и попадают в srcset."""
+        thumbnails.generate_variants(self.post.pk)
+        variants = self.post.image_variants.all()
+        self.assertEqual(
+            {(variant.format, variant.width) for variant in variants},
+            {(image_format, width)
+             for image_format in thumbnails.variant_formats()
+             for width in settings.POSTS_IMAGE_WIDTHS})
+        names = set(variants.values_list('name', flat=True))
+        thumbnails.generate_variants(self.post.pk)
+        self.assertEqual(
+            set(self.post.image_variants.values_list('name', flat=True)),
+            names)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'image/webp')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.match = Post.objects.create(
+            author=cls.user, text='Капитанская дочка и метель')
+        cls.better = Post.objects.create(
+            author=cls.user, text='Метель, метель, снова метель')
+        Post.objects.create(author=cls.user, text='Евгений Онегин')
+
+    def test_search_ranks_and_paginates(self):
+        """Поиск находит посты по словам и ранжирует их."""
+        response = self.client.get(reverse('posts:search'), {'q': 'метель'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 2)
+        self.assertEqual(list(page_obj), [self.better, self.match])
+
+    def test_search_index_follows_writes(self):
+        """Индекс обновляется при изменении и удалении постов."""
+        Post.objects.filter(pk=self.match.pk).update(text='Пиковая дама')
+        Post.objects.filter(pk=self.better.pk).delete()
+        self.assertEqual(list(search_posts('метель')[0:10]), [])
+        self.assertEqual(list(search_posts('дама')[0:10]), [self.match])
+
+    def test_search_respects_filtered_posts(self):
+        """Число и страницы считаются только по переданным постам."""
+        other = User.objects.create_user(username='reader')
+        Post.objects.create(author=other, text='Чужая метель')
+        results = search_posts('метель', Post.objects.filter(author=self.user))
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(list(results[0:10]), [self.better, self.match])
+
+    @skipUnless(connection.vendor == 'postgresql', 'поиск PostgreSQL')
+    def test_postgresql_search(self):
+        other = User.objects.create_user(username='reader')
+        Post.objects.create(author=other, text='Чужая метель')
+        results = search_posts('метель', Post.objects.filter(author=self.user))
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(list(results[0:10]), [self.better, self.match])
+        self.assertEqual(
+            search_posts('метель" OR NEAR(*').count(), 0)
+
+    def test_search_query_syntax_is_escaped(self):
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'метель" OR NEAR(*'})
+        self.assertEqual(response.status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+    """Неизменившиеся страницы отдаются ответом 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Текст', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.group_url = reverse('posts:group_list', args=(self.group.slug,))
+        self.post_url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_not_modified(self):
+        for url in (self.group_url, self.post_url,
+                    reverse('posts:profile', args=('author',))):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_not_modified_skips_view(self):
+        etag = self.client.get(self.group_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.group_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_for_guest(self):
+        last_modified = self.client.get(self.group_url)['Last-Modified']
+        response = self.client.get(
+            self.group_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_etag(self):
+        writes = (
+            (self.group_url, lambda: Post.objects.create(
+                author=self.reader, text='Новый', group=self.group)),
+            (self.post_url, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')),
+            (self.post_url, lambda: Post.objects.create(
+                author=self.author, text='Ещё пост')),
+            (self.group_url, lambda: Group.objects.filter(
+                pk=self.group.pk).first().save()),
+        )
+        for url, write in writes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                write()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_moved_post_changes_old_group(self):
+        etag = self.client.get(self.group_url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        response = self.client.get(self.group_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_varies_per_user(self):
+        etag = self.client.get(self.post_url)['ETag']
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(
+            self.revalidate(self.post_url, reader_client).status_code, 304)
+
+    def test_missing_post_not_found(self):
+        response = self.client.get(reverse('posts:post_detail', args=(0,)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_pages_not_cached(self):
+        """Страница несуществующего объекта отдаётся без ETag."""
+        for url in (reverse('posts:group_list', args=('missing',)),
+                    reverse('posts:profile', args=('missing',))):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+        self.assertIsNone(freshness.last_changed([('group', 'missing')]))
+        self.assertIsNone(cache.get(
+            freshness.CHANGED_KEY.format('group', 'missing')))
+
+
+class AnonymousPageCacheTests(TestCase):
+    """Гости получают index и group_list из кэша страниц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='page-cache', description='Описание')
+        Post.objects.create(author=cls.author, text='Текст', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+        )
+
+    def test_guest_served_from_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+                self.assertContains(response, 'Войти')
+                self.assertNotContains(response, 'page-hole')
+
+    def test_authenticated_bypass(self):
+        self.client.force_login(self.author)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                response = self.client.get(url)
+                self.assertNotIn('X-Page-Cache', response)
+                self.assertContains(response, 'Пользователь: author')
+
+    def test_post_write_invalidates(self):
+        for url in self.urls:
+            self.client.get(url)
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'miss')
+                self.assertContains(response, 'Новый пост')
+
+    def test_holes_filled_per_request(self):
+        """Шапка сохранённой страницы отрисовывается для текущего запроса."""
+        self.client.get(self.urls[0])
+        content, _ = posts_cache.get_cache().get(
+            pagecache.page_key(RequestFactory().get(self.urls[0])))
+        self.assertIn(pagecache.hole('includes/header.html'), content)
+        request = RequestFactory().get(self.urls[0])
+        request.user = self.author
+        self.assertIn(
+            'Пользователь: author', pagecache.fill_holes(content, request))
+
+    def test_csrf_response_not_stored(self):
+        @pagecache.anonymous_page_cache
+        def view(request):
+            return HttpResponse(get_token(request))
+
+        factory = RequestFactory()
+        view(factory.get('/csrf/'))
+        self.assertNotIn('X-Page-Cache', view(factory.get('/csrf/')))
@@ -0,0 +1,156 @@
+"""Фоновая генерация миниатюр и вариантов картинок постов.
+
+Миниатюра и варианты для srcset готовятся пулом потоков сразу после
+сохранения поста.
+Шаблоны берут только уже готовую миниатюру из хранилища sorl-thumbnail
+и до её появления показывают заглушку, не блокируя ответ на декодировании
+и масштабировании картинки.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import cache, freshness
+from .models import Post, PostImageVariant
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTH = 960
+THUMBNAIL_HEIGHT = 339
+THUMBNAIL_GEOMETRY = f'{THUMBNAIL_WIDTH}x{THUMBNAIL_HEIGHT}'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+_executor = None
+_pending = set()
+_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnail')
+    return _executor
+
+
+def generate(name):
+    """Создаёт миниатюру картинки name, если её ещё нет."""
+    try:
+        get_thumbnail(name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    except Exception:
+        logger.exception('Thumbnail for %s failed', name)
+
+
+def variant_formats():
+    """Форматы вариантов, которые умеют записать и Pillow, и sorl."""
+    Image.init()
+    return [
+        image_format for image_format in settings.POSTS_IMAGE_FORMATS
+        if image_format in Image.SAVE and image_format in EXTENSIONS
+    ]
+
+
+def generate_variants(post_id):
+    """Создаёт варианты картинки поста во всех размерах и форматах.
+
+    Уже созданные для текущей картинки варианты не пересоздаются.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    name = post.image.name
+    generate(name)
+    if post.image_variants.filter(source=name).exists():
+        return
+    variants = []
+    for image_format in variant_formats():
+        for width in settings.POSTS_IMAGE_WIDTHS:
+            height = round(width * THUMBNAIL_HEIGHT / THUMBNAIL_WIDTH)
+            try:
+                thumbnail = get_thumbnail(
+                    name, f'{width}x{height}',
+                    format=image_format, **THUMBNAIL_OPTIONS)
+            except Exception:
+                logger.exception(
+                    'Variant %sx%s %s for %s failed',
+                    width, height, image_format, name)
+                continue
+            variants.append(PostImageVariant(
+                post=post, source=name, name=thumbnail.name,
+                format=image_format, width=width, height=height))
+    with transaction.atomic():
+        post.image_variants.all().delete()
+        PostImageVariant.objects.bulk_create(variants)
+    cache.bump_version('post')
+    freshness.post_changed(post)
+
+
+def _run_in_worker(job, arg):
+    try:
+        job(arg)
+    finally:
+        with _lock:
+            _pending.discard((job.__name__, arg))
+        connection.close()
+
+
+def schedule_on_commit(job, arg):
+    """Планирует job(arg) после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: schedule(job, arg))
+
+
+def schedule(job, arg):
+    """Ставит job(arg) в очередь пула, без повторов.
+
+    При POSTS_THUMBNAIL_ASYNC = False задача выполняется сразу.
+    """
+    if not settings.POSTS_THUMBNAIL_ASYNC:
+        job(arg)
+        return None
+    with _lock:
+        if (job.__name__, arg) in _pending:
+            return None
+        _pending.add((job.__name__, arg))
+    return get_executor().submit(_run_in_worker, job, arg)
+
+
+def _thumbnail_options(source):
+    """Опции так, как их дополняет ThumbnailBackend.get_thumbnail."""
+    backend = default.backend
+    options = dict(THUMBNAIL_OPTIONS)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def ready_thumbnail(image):
+    """Готовая миниатюра картинки или None.
+
+    Отсутствующая миниатюра ставится в очередь на генерацию.
+    """
+    if not image:
+        return None
+    source = ImageFile(image)
+    name = default.backend._get_thumbnail_filename(
+        source, THUMBNAIL_GEOMETRY, _thumbnail_options(source))
+    thumbnail = default.kvstore.get(ImageFile(name, default.storage))
+    if thumbnail is None:
+        schedule_on_commit(generate, image.name)
+    return thumbnail
@@ -0,0 +1,67 @@
+"""Быстрое построение адресов страниц по именам маршрутов.
+
+reverse() при каждом вызове перебирает варианты маршрута и проверяет
+подставленные значения регулярными выражениями, а страница списка
+строит по три адреса на каждый пост. build() один раз получает через
+reverse() шаблон пути с метками вместо аргументов и дальше только
+подставляет в него экранированные значения.
+
+Результат совпадает с reverse() для значений, которые принимает
+маршрут. Сами значения не проверяются: они берутся из базы. Маршруты,
+для которых шаблон построить нельзя, обслуживает обычный reverse().
+"""
+from urllib.parse import quote
+
+from django.conf import settings
+from django.urls import NoReverseMatch, get_script_prefix, get_urlconf
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS, escape_leading_slashes
+
+# Символы, которые reverse() не экранирует
+SAFE_CHARS = RFC3986_SUBDELIMS + '/~:@'
+# Метка i-го аргумента: из одних цифр, чтобы подойти любому конвертеру
+PLACEHOLDER = '7305{}9511'
+MAX_ARGS = 5
+
+_templates = {}
+
+
+def _compile(name, urlconf):
+    """Шаблон str.format для пути маршрута name без префикса или None."""
+    for count in range(MAX_ARGS + 1):
+        placeholders = [PLACEHOLDER.format(index) for index in range(count)]
+        try:
+            url = reverse(name, urlconf, args=placeholders)
+        except NoReverseMatch:
+            continue
+        path = url[len(get_script_prefix()):]
+        template = path.replace('{', '{{').replace('}', '}}')
+        for index, placeholder in enumerate(placeholders):
+            if path.count(placeholder) != 1:
+                return None
+            template = template.replace(placeholder, f'{{{index}}}')
+        return count, template
+    return None
+
+
+def _template(name):
+    urlconf = get_urlconf() or settings.ROOT_URLCONF
+    key = (urlconf, name)
+    if key not in _templates:
+        _templates[key] = _compile(name, urlconf)
+    return _templates[key]
+
+
+def _quote(value):
+    if type(value) is int:
+        return str(value)
+    return quote(str(value), safe=SAFE_CHARS)
+
+
+def build(name, *args):
+    """Адрес маршрута name с позиционными args, как reverse(name, args)."""
+    compiled = _template(name)
+    if compiled is None or compiled[0] != len(args):
+        return reverse(name, args=args)
+    url = get_script_prefix() + compiled[1].format(*map(_quote, args))
+    return escape_leading_slashes(url) if url.startswith('//') else url
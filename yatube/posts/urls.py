@@ -12,6 +12,8 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Поиск по тексту записей
+    path('search/', views.search, name='search'),
     # Cоздание новой записи
     path('create/', views.post_create, name='post_create'),
     # Редактирование записи
@@ -1,12 +1,198 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .counts import cached_count
 
 # Глобальная константа, определяющая количество последних записей.
 COUNT_LAST_POSTS = 10
 
+# Сколько номеров страниц показывать вокруг текущей и у краёв.
+PAGE_WINDOW_ON_EACH_SIDE = 2
+PAGE_WINDOW_ON_ENDS = 1
+
+# Направления перехода, зашитые в курсор.
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, obj):
+    """Упаковывает позицию (pub_date, id) в непрозрачный токен."""
+    raw = f'{direction}|{obj.pub_date.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора.
+
+    Возвращает кортеж (direction, pub_date, pk) или None,
+    если токен повреждён.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (pub_date, id) вместо OFFSET.
+
+    Каждая страница выбирается одним запросом с LIMIT по индексу,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    COUNT(*) не выполняется, пока к count явно не обратятся.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(
+            object_list.order_by('-pub_date', '-pk'), per_page)
+
+    @cached_property
+    def count(self):
+        return self.object_list.count()
+
+    def page(self, token=None):
+        """Возвращает страницу, следующую за курсором token."""
+        cursor = decode_cursor(token) if token else None
+        queryset = self.object_list
+        if cursor is None:
+            direction = None
+        else:
+            direction, pub_date, pk = cursor
+            if direction == CURSOR_NEXT:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+                ).reverse()
+        return CursorPage(queryset, direction, self)
+
+
+class CursorPage(Page):
+    """Страница курсорного паджинатора, которая читает посты лениво.
+
+    Запрос выполняется при первом обращении к постам или курсорам,
+    поэтому фрагмент страницы из кэша шаблонов обходится без него.
+    """
+
+    def __init__(self, queryset, direction, paginator):
+        self.direction = direction
+        super().__init__(queryset, 1, paginator)
+
+    @property
+    def object_list(self):
+        return self._window[0]
+
+    @object_list.setter
+    def object_list(self, queryset):
+        self._queryset = queryset
+        self.__dict__.pop('_window', None)
+
+    @cached_property
+    def _window(self):
+        per_page = self.paginator.per_page
+        objects = list(self._queryset[:per_page + 1])
+        has_more = len(objects) > per_page
+        objects = objects[:per_page]
+        if self.direction == CURSOR_PREVIOUS:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, self.direction is not None
+        next_cursor = (
+            encode_cursor(CURSOR_NEXT, objects[-1])
+            if has_next and objects else None)
+        previous_cursor = (
+            encode_cursor(CURSOR_PREVIOUS, objects[0])
+            if has_previous and objects else None)
+        return objects, next_cursor, previous_cursor
+
+    @property
+    def next_cursor(self):
+        return self._window[1]
+
+    @property
+    def previous_cursor(self):
+        return self._window[2]
+
+
+def map_page(page, function):
+    """Обычная Page с function(obj) вместо объектов page.
+
+    Ссылки навигации (курсоры и окно номеров) переносятся как есть.
+    """
+    mapped = Page([function(obj) for obj in page], page.number,
+                  page.paginator)
+    for name in ('next_cursor', 'previous_cursor', 'page_window'):
+        if hasattr(page, name):
+            setattr(mapped, name, getattr(page, name))
+    return mapped
+
+
+class WindowedPaginator(Paginator):
+    """Паджинатор по номерам страниц с окном ссылок и кэшем числа строк.
+
+    Если задан scope, count берётся из кэша, который сбрасывают записи
+    постов. window() возвращает номера вокруг текущей страницы и у
+    краёв, поэтому навигация не растёт вместе с числом страниц.
+    """
+
+    def __init__(self, object_list, per_page, scope=None):
+        super().__init__(object_list, per_page)
+        self.scope = scope
+
+    @cached_property
+    def count(self):
+        if self.scope is None:
+            return super().count
+        return cached_count(self.scope, self.object_list)
+
+    def window(self, number, on_each_side=PAGE_WINDOW_ON_EACH_SIDE,
+               on_ends=PAGE_WINDOW_ON_ENDS):
+        """Номера страниц для навигации; None обозначает пропуск."""
+        last = self.num_pages
+        shown = sorted(
+            {*range(1, min(on_ends, last) + 1),
+             *range(max(number - on_each_side, 1),
+                    min(number + on_each_side, last) + 1),
+             *range(max(last - on_ends + 1, 1), last + 1)})
+        pages = []
+        for page in shown:
+            if pages and page - pages[-1] > 1:
+                pages.append(page - 1 if page - pages[-1] == 2 else None)
+            pages.append(page)
+        return pages
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        page.page_window = self.window(page.number)
+        return page
+
+
+def my_paginator(request, posts, scope=None):
+    """Разбивает посты на страницы.
 
-def my_paginator(request, posts):
-    """Главная страница сайта"""
-    paginator = Paginator(posts, COUNT_LAST_POSTS)
+    По умолчанию используется курсорная паджинация (?cursor=...).
+    Старые ссылки вида ?page=N по-прежнему обслуживаются
+    классическим паджинатором с OFFSET; scope вида ('group', pk)
+    включает кэш числа постов для него.
+    """
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        paginator = WindowedPaginator(posts, COUNT_LAST_POSTS, scope)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(posts, COUNT_LAST_POSTS)
+    return paginator.page(request.GET.get('cursor'))
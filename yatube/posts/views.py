@@ -1,30 +1,42 @@
+import uuid
+from urllib.parse import urlencode
 from xml.dom import ValidationErr
 
 from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import commentqueue, freshness, stats
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import my_paginator
+from .models import FeedEntry, Follow, Group, Post, User
+from .pagecache import anonymous_page_cache
+from .search import search_posts
+from .utils import (
+    COUNT_LAST_POSTS, WindowedPaginator, map_page, my_paginator)
 
 
+@anonymous_page_cache
 def index(request):
     """Главная страница сайта"""
     template = 'posts/index.html'
-    posts = Post.objects.select_related('author', 'group').all()
-    page_obj = my_paginator(request, posts)
+    posts = Post.objects.select_related('author', 'group').prefetch_related(
+        'image_variants')
+    page_obj = my_paginator(request, posts, ('index', ''))
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@freshness.conditional(freshness.group_page)
+@anonymous_page_cache
 def group_posts(request, slug=None):
     """Страница постов определенной группы"""
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    posts = group.posts.select_related('author', 'group').all()
-    page_obj = my_paginator(request, posts)
+    posts = group.posts.select_related('author', 'group').prefetch_related(
+        'image_variants')
+    page_obj = my_paginator(request, posts, ('group', group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -32,33 +44,65 @@ def group_posts(request, slug=None):
     return render(request, template, context)
 
 
+@freshness.conditional(freshness.profile_page)
 def profile(request, username):
     """Страница профайла пользователя, его посты"""
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
     template = 'posts/profile.html'
-    profile_list = author.posts.all()
-    page_obj = my_paginator(request, profile_list)
+    profile_list = author.posts.select_related(
+        'author', 'group').prefetch_related('image_variants')
+    page_obj = my_paginator(
+        request, profile_list, ('author', author.pk))
     following = (
         request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author).exists())
     context = {
         'author': author,
+        'stats': stats.for_author(author),
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, template, context)
 
 
+@freshness.conditional(freshness.post_page)
 def post_detail(request, post_id):
     """Страница отдельного поста, детали поста"""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group').prefetch_related(
+            'image_variants'),
+        id=post_id)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.all().filter(post__id=post_id)
+    comments = post.comments.select_related('author')
+    if commentqueue.enabled():
+        comments = list(comments)
+        comments += commentqueue.pending(request.user, post, comments)
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'comment_key': uuid.uuid4(),
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    """Поиск постов по тексту с ранжированием по релевантности"""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        posts = Post.objects.select_related(
+            'author', 'group').prefetch_related('image_variants')
+        paginator = WindowedPaginator(
+            search_posts(query, posts), COUNT_LAST_POSTS)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'query_prefix': urlencode({'q': query}) + '&',
     }
     return render(request, template, context)
 
@@ -74,7 +118,8 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            with transaction.atomic():
+                post.save()
             return redirect('posts:profile', username=request.user)
         return render(request, template, {'form': form})
     form = PostForm()
@@ -113,10 +158,21 @@ def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
+        key = commentqueue.parse_key(request.POST.get('idempotency_key'))
+        if commentqueue.enabled():
+            commentqueue.enqueue(
+                post, request.user, form.cleaned_data['text'], key)
+            return redirect('posts:post_detail', post_id=post_id)
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        comment.idempotency_key = key
+        try:
+            with transaction.atomic():
+                comment.save()
+        except IntegrityError:
+            # Повтор уже принятой отправки формы
+            pass
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -124,11 +180,12 @@ def add_comment(request, post_id):
 def follow_index(request):
     """Создаёт страницу с постами авторов,
     на которых подписан пользователь"""
-    user = request.user
-    following_list = Post.objects.select_related(
-        'author', 'group').filter(
-            author__following__user=user)
-    page_obj = my_paginator(request, following_list)
+    feed = FeedEntry.objects.select_related(
+        'post__author', 'post__group').prefetch_related(
+            'post__image_variants').filter(user=request.user)
+    page_obj = map_page(
+        my_paginator(request, feed, ('feed', request.user.pk)),
+        lambda entry: entry.post)
     template = 'posts/follow.html'
     context = {
         'page_obj': page_obj
@@ -142,10 +199,11 @@ def profile_follow(request, username):
     guest = request.user
     author = get_object_or_404(User, username=username)
     if guest != author:
-        Follow.objects.get_or_create(
-            user=guest,
-            author=author
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=guest,
+                author=author
+            )
     return redirect('posts:follow_index')
 
 
@@ -153,7 +211,6 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     """Отменяет подписку на автора"""
     author = get_object_or_404(User, username=username)
-    follower = Follow.objects.filter(user=request.user, author=author)
-    if follower.exists():
-        follower.delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'debug_toolbar',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -52,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryInspectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,17 +63,23 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Рабочий режим шаблонов: кэширующий загрузчик разбирает каждый шаблон
+# один раз на процесс, а wsgi.py компилирует все шаблоны при запуске.
+# При отладке шаблоны перечитываются на каждый запрос.
+TEMPLATE_CACHE = not DEBUG or bool(os.getenv('YATUBE_TEMPLATE_CACHE'))
+TEMPLATE_PRECOMPILE = TEMPLATE_CACHE
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
+        'APP_DIRS': not TEMPLATE_CACHE,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -82,6 +91,16 @@ TEMPLATES = [
         },
     },
 ]
+if TEMPLATE_CACHE:
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    # Шаблоны приложений загружает app_directories внутри кэширующего
+    # загрузчика, а debug toolbar проверяет только APP_DIRS.
+    SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -93,9 +112,73 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, PRAGMA не повторяются
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # Секунды ожидания блокировки записи
+            'timeout': 20,
+        },
     }
 }
 
+# PRAGMA, выполняемые при открытии соединения SQLite. Профиль
+# выбирается переменной окружения YATUBE_SQLITE_PROFILE.
+SQLITE_PROFILES = {
+    # Поведение SQLite по умолчанию: журнал не меняется, поэтому
+    # база, однажды переведённая в WAL, в нём и остаётся.
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+        'mmap_size': 268435456,
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PRAGMAS = SQLITE_PROFILES[
+    os.getenv('YATUBE_SQLITE_PROFILE', 'default')]
+
+# Реплики только для чтения: пути к файлам SQLite через двоеточие
+# в YATUBE_REPLICA_DBS. В тестах они зеркалируют основную базу.
+REPLICA_DATABASES = []
+for number, name in enumerate(
+        filter(None, os.getenv('YATUBE_REPLICA_DBS', '').split(':')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Приложения, модели которых читаются с реплик, и страницы, на которых
+# это разрешено
+REPLICA_APPS = ('posts',)
+REPLICA_READ_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'api:posts',
+    'api:posts_bulk',
+    'api:post',
+    'api:comments',
+    'api:groups',
+    'api:group',
+)
+# Страницы, которые пишут в базу по GET: после них чтение, как после
+# POST, идёт из основной базы
+REPLICA_WRITE_VIEWS = (
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+)
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,10 +232,98 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
+# Общий для всех воркеров кэш выбирается переменной окружения
+# YATUBE_CACHE: locmem (по умолчанию), file, memcached или redis.
+# memcached требует пакет python-memcached, redis — django-redis;
+# оба указаны в requirements.txt как необязательные.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('YATUBE_CACHE', 'locmem')],
+}
+
+# Алиас из CACHES для фрагментов страниц постов
+POSTS_FRAGMENT_CACHE = 'default'
+
+# Сколько секунд гости получают страницы из полностраничного кэша
+# и шаблоны, которые отрисовываются для каждого запроса заново
+PAGE_CACHE_TIMEOUT = 60
+PAGE_CACHE_HOLES = (
+    'includes/header.html',
+    'posts/includes/switcher.html',
+)
+
+# Миниатюры картинок постов генерируются пулом потоков; при отладке
+# они создаются сразу после сохранения поста.
+POSTS_THUMBNAIL_ASYNC = not DEBUG
+POSTS_THUMBNAIL_WORKERS = 2
+# Размеры и форматы вариантов картинок для srcset; форматы, которые
+# не поддерживает установленный Pillow (например, AVIF), пропускаются.
+POSTS_IMAGE_WIDTHS = (480, 960, 1440)
+POSTS_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+
+# Отложенная запись комментариев: форма кладёт комментарий в очередь
+# в каталоге COMMENT_SPOOL_DIR, а фоновый поток раз в
+# COMMENT_FLUSH_INTERVAL секунд вставляет очередь пачками.
+# Интервал 0 оставляет разбор очереди команде flush_comments.
+COMMENT_WRITE_BEHIND = bool(os.getenv('YATUBE_COMMENT_WRITE_BEHIND'))
+COMMENT_SPOOL_DIR = os.getenv(
+    'YATUBE_COMMENT_SPOOL_DIR', os.path.join(BASE_DIR, 'spool', 'comments'))
+COMMENT_FLUSH_INTERVAL = 0.5
+COMMENT_FLUSH_BATCH = 500
+
+# Доля запросов, для которых собираются метрики производительности;
+# 0 выключает сбор.
+METRICS_SAMPLE_RATE = float(os.getenv('YATUBE_METRICS_SAMPLE_RATE', '0.1'))
+# Писать ли замеры каждого выбранного запроса в лог yatube.metrics
+METRICS_LOG = bool(os.getenv('YATUBE_METRICS_LOG'))
+# Адреса, которым доступна страница /metrics
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Профиль отрисовки по шаблонам и тегам для запросов из выборки
+# метрик; выключен, потому что оборачивает отрисовку каждого тега.
+TEMPLATE_PROFILE = bool(os.getenv('YATUBE_TEMPLATE_PROFILE'))
+TEMPLATE_PROFILE_TAGS = (
+    'include', 'url', 'fast_url', 'static', 'thumbnail', 'fragment_cache',
+    'page_hole', 'post_picture', 'post_thumbnail',
+)
+
+# Поиск медленных запросов и N+1: '' — выключен, 'log' — запись
+# в лог yatube.queries, 'raise' — ошибка на страницах из
+# QUERY_INSPECTION_MODULES (для тестов).
+QUERY_INSPECTION = os.getenv('YATUBE_QUERY_INSPECTION', '')
+QUERY_INSPECTION_MODULES = ('posts.views',)
+SLOW_QUERY_MS = 100
+NPLUSONE_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.metrics': {'handlers': ['console'], 'level': 'INFO'},
+        'yatube.queries': {'handlers': ['console'], 'level': 'WARNING'},
+    },
 }
 
 INTERNAL_IPS = [